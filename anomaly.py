@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Deteksi anomali streaming per sensor & komponen (X/Y/Z).
+
+Statistik online diperbarui saat ingest, hanya untuk sampel baru:
+  - Welford (mean/varians kumulatif) -> z-score
+  - EWMA -> drift (EWMA menjauh dari mean jangka panjang)
+  - median/MAD jendela bergeser (sorted window + bisect) -> robust z-score
+Sensitivitas otomatis mengikuti noise floor masing-masing sensor, dengan
+lantai ANOM_MIN_STD / ANOM_MIN_DEV supaya gerakan kecil pada sensor yang sangat
+tenang tidak dianggap anomali. Alert statistik hanya menyalakan status ON bila
+LONGSOR_ANOM_TRIGGER=1; selain itu hanya ditampilkan (popup marker & header drawer).
+Juga mencatat kapan terakhir |nilai| > ambang tetap 2.0, supaya status
+marker tidak perlu memindai seluruh array di setiap callback.
+"""
+
+import bisect
+import datetime as dt
+import math
+import threading
+from collections import deque
+
+from app import (
+    ANOM_WINDOW, ANOM_EWMA_ALPHA, ANOM_Z, ANOM_RZ, ANOM_DRIFT, ANOM_MIN_SAMPLES, ANOM_HOLD_H,
+    ANOM_MIN_STD, ANOM_MIN_DEV, ANOM_TRIGGER
+)
+
+FIXED_THRESHOLD = 2.0
+
+def _kth_of_two(a_at, m, b_at, n, k):
+    """Elemen ke-k (0-based) dari gabungan dua barisan terurut naik, O(log(m+n))."""
+    lo, hi = max(0, k + 1 - n), min(k + 1, m)
+    while lo <= hi:
+        i = (lo + hi) // 2
+        j = k + 1 - i
+        if i > 0 and j < n and a_at(i - 1) > b_at(j):
+            hi = i - 1
+        elif j > 0 and i < m and b_at(j - 1) > a_at(i):
+            lo = i + 1
+        else:
+            return max(a_at(i - 1) if i > 0 else -math.inf, b_at(j - 1) if j > 0 else -math.inf)
+    raise ValueError("k di luar jangkauan")
+
+class RollingMedianMAD:
+    """Median & MAD pada N sampel terakhir.
+
+    Jendela disimpan terurut (bisect); MAD dihitung tanpa menyalin jendela:
+    simpangan |a_i - median| membentuk dua barisan terurut (kiri & kanan
+    median) sehingga median-nya bisa dicari dengan seleksi k-th O(log N).
+    """
+
+    def __init__(self, size: int):
+        self.size = int(size)
+        self.fifo = deque()
+        self.sorted = []
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def push(self, x: float):
+        self.fifo.append(x)
+        bisect.insort(self.sorted, x)
+        if len(self.fifo) > self.size:
+            old = self.fifo.popleft()
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+
+    def median(self) -> float | None:
+        a, n = self.sorted, len(self.sorted)
+        if not n:
+            return None
+        return a[n // 2] if n % 2 else 0.5 * (a[n // 2 - 1] + a[n // 2])
+
+    def mad(self) -> float | None:
+        a, n = self.sorted, len(self.sorted)
+        med = self.median()
+        if med is None:
+            return None
+        p = bisect.bisect_left(a, med)
+        left = lambda i: med - a[p - 1 - i]     # naik saat i naik
+        right = lambda j: a[p + j] - med        # naik saat j naik
+        kth = lambda k: _kth_of_two(left, p, right, n - p, k)
+        return kth(n // 2) if n % 2 else 0.5 * (kth(n // 2 - 1) + kth(n // 2))
+
+class ComponentStats:
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = None
+        self.window = RollingMedianMAD(ANOM_WINDOW)
+        self.z = self.rz = self.drift = None
+
+    def std(self) -> float | None:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
+
+    @staticmethod
+    def _score(dev: float, scale: float | None, floor: float) -> float | None:
+        """dev / max(scale, floor); None bila |dev| di bawah ANOM_MIN_DEV."""
+        if scale is None or abs(dev) < ANOM_MIN_DEV:
+            return None
+        return dev / max(scale, floor)
+
+    def push(self, x: float) -> str | None:
+        """Skor sampel terhadap statistik *sebelum* sampel masuk, lalu perbarui. Return alasan alert."""
+        reason = None
+        sd, med, mad = self.std(), self.window.median(), self.window.mad()
+        if self.n >= ANOM_MIN_SAMPLES:
+            self.z = self._score(x - self.mean, sd, ANOM_MIN_STD)
+            rz = self._score(x - med, mad, 0.6745 * ANOM_MIN_STD)
+            self.rz = None if rz is None else 0.6745 * rz
+            if self.z is not None and abs(self.z) > ANOM_Z:
+                reason = f"z={self.z:+.1f}"
+            elif self.rz is not None and abs(self.rz) > ANOM_RZ:
+                reason = f"robust z={self.rz:+.1f}"
+        # Welford
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+        # EWMA & drift
+        self.ewma = x if self.ewma is None else ANOM_EWMA_ALPHA * x + (1 - ANOM_EWMA_ALPHA) * self.ewma
+        sd = self.std()
+        self.drift = self._score(self.ewma - self.mean, sd, ANOM_MIN_STD)
+        if reason is None and self.n >= ANOM_MIN_SAMPLES and self.drift is not None and abs(self.drift) > ANOM_DRIFT:
+            reason = f"drift={self.drift:+.1f}"
+        self.window.push(x)
+        return reason
+
+class SensorAnomaly:
+    def __init__(self):
+        self.comps = {c: ComponentStats() for c in ("X", "Y", "Z")}
+        self.last_t = None
+        self.last_alert = None      # (iso, "X: z=+5.1")
+        self.last_thr = None        # iso saat terakhir |nilai| > FIXED_THRESHOLD
+
+    def push(self, t_s: float, iso: str, vals: dict):
+        self.last_t = t_s
+        for c, v in vals.items():
+            if v is None or math.isnan(v):
+                continue
+            if abs(v) > FIXED_THRESHOLD:
+                self.last_thr = iso
+            reason = self.comps[c].push(v)
+            if reason:
+                self.last_alert = (iso, f"{c}: {reason}")
+
+    def snapshot(self) -> dict:
+        """Hanya yang dibaca UI/status; statistik per komponen tetap di tracker."""
+        return {
+            "last_alert": self.last_alert[0] if self.last_alert else None,
+            "reason": self.last_alert[1] if self.last_alert else None,
+            "last_thr": self.last_thr,
+        }
+
+class AnomalyTracker:
+    """Registry state per `site:sid`; sampel yang sudah diproses dilewati."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict[str, SensorAnomaly] = {}
+
+    def update(self, key: str, times: list[float], isos: list[str], X, Y, Z) -> dict:
+        with self._lock:
+            st = self._state.get(key)
+            if st is None:
+                st = self._state[key] = SensorAnomaly()
+            for i, t in enumerate(times):
+                if st.last_t is not None and t <= st.last_t:
+                    continue
+                st.push(t, isos[i], {"X": X[i], "Y": Y[i], "Z": Z[i]})
+            return st.snapshot()
+
+ANOMALY = AnomalyTracker()
+
+def _recent(iso: str | None, now: dt.datetime, hours: float) -> bool:
+    if not iso:
+        return False
+    return (now - dt.datetime.fromisoformat(iso)) <= dt.timedelta(hours=hours)
+
+def recent_alert(anom: dict | None, now: dt.datetime | None = None) -> tuple[str, str] | None:
+    """(iso, alasan) alert statistik terakhir bila masih dalam ANOM_HOLD_H jam."""
+    if not anom or not _recent(anom.get("last_alert"), now or dt.datetime.now(dt.timezone.utc), ANOM_HOLD_H):
+        return None
+    return anom["last_alert"], anom.get("reason") or ""
+
+def anomaly_breach(anom: dict | None, now: dt.datetime | None = None) -> bool:
+    """True bila |nilai| > 2.0 (atau, dengan ANOM_TRIGGER, ada alert statistik) dalam ANOM_HOLD_H jam terakhir."""
+    if not anom:
+        return False
+    now = now or dt.datetime.now(dt.timezone.utc)
+    if ANOM_TRIGGER and _recent(anom.get("last_alert"), now, ANOM_HOLD_H):
+        return True
+    return _recent(anom.get("last_thr"), now, ANOM_HOLD_H)
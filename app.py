@@ -6,6 +6,8 @@ Created on Tue Mar 16 15:08:31 2021
 """
 
 import datetime as dt
+import json
+import os
 
 import dash
 import dash_leaflet as dl
@@ -17,11 +19,14 @@ server = app.server  # untuk deployment (gunicorn/uwsgi)
 
 # =============== KONFIG / KONSTANTA ===============
 UTC = getattr(dt, "UTC", dt.timezone.utc)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Ganti jika API/WS di host lain:
 API_BASE = "https://websocket-server-v2.onrender.com"
 # Kamu sudah set ini di filemu:
 WS_URL   = "wss://websocket-server-v2.onrender.com/ws?days=3"
+# Override untuk uji beban (server replay lokal, lihat loadtest.py)
+WS_URL   = os.environ.get("LONGSOR_WS_URL", WS_URL)
 
 # Tile layers
 OSM = "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
@@ -31,6 +36,64 @@ ESRI_NATGEO        = "https://server.arcgisonline.com/ArcGIS/rest/services/NatGe
 ESRI_WORLD_TOPO    = "https://server.arcgisonline.com/ArcGIS/rest/services/World_Topo_Map/MapServer/tile/{z}/{y}/{x}"
 ATTR_OSM  = "© OpenStreetMap"
 ATTR_ESRI = "Tiles © Esri"
+TILE_SOURCES = {
+    "esri_imagery": ESRI_WORLD_IMAGERY,
+    "esri_street":  ESRI_WORLD_STREET,
+    "esri_natgeo":  ESRI_NATGEO,
+    "esri_topo":    ESRI_WORLD_TOPO,
+    "osm":          OSM,
+}
+
+# Tile proxy + cache disk lokal (opsional, lihat tileproxy.py)
+TILE_PROXY        = os.environ.get("LONGSOR_TILE_PROXY", "0") == "1"
+TILE_CACHE_DIR    = os.environ.get("LONGSOR_TILE_CACHE_DIR", os.path.join(BASE_DIR, "tile_cache"))
+TILE_CACHE_MAX_MB = float(os.environ.get("LONGSOR_TILE_CACHE_MB", "512"))
+
+def tile_url(layer: str) -> str:
+    """URL TileLayer: langsung ke upstream, atau ke route proxy bila TILE_PROXY aktif."""
+    if TILE_PROXY:
+        return f"{app.config.requests_pathname_prefix}tiles/{layer}/{{z}}/{{x}}/{{y}}"
+    return TILE_SOURCES[layer]
+
+# Aset statis terkompresi + fingerprint (hasil `python build_assets.py`)
+STATIC_BUILD_DIR = os.environ.get("LONGSOR_STATIC_BUILD_DIR", os.path.join(BASE_DIR, "static_build"))
+
+def load_asset_manifest() -> dict:
+    try:
+        with open(os.path.join(STATIC_BUILD_DIR, "manifest.json"), encoding="utf-8") as fh:
+            return json.load(fh).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+ASSET_MANIFEST = load_asset_manifest()
+
+def asset_entry(path: str) -> dict | None:
+    """Entri manifest untuk assets/<path>, hanya bila sumbernya belum berubah sejak build."""
+    entry = ASSET_MANIFEST.get(path)
+    if not entry:
+        return None
+    try:
+        st = os.stat(os.path.join(app.config.assets_folder, *path.split("/")))
+    except OSError:
+        return None
+    if st.st_size != entry.get("size") or st.st_mtime_ns != entry.get("mtime_ns"):
+        return None
+    return entry
+
+def asset_url(path: str) -> str:
+    """URL fingerprint (cache immutable) bila build masih cocok; fallback ke /assets/ biasa."""
+    entry = asset_entry(path)
+    if entry:
+        return f"{app.config.requests_pathname_prefix}static-build/{entry['path']}"
+    return app.get_asset_url(path)
+
+# Profiling callback opsional (lihat profiling.py)
+PROFILE_MODE        = os.environ.get("LONGSOR_PROFILE", "").lower()   # "", "sample", "cprofile"
+PROFILE_HEADER_OK   = os.environ.get("LONGSOR_PROFILE_HEADER", "0") == "1"
+PROFILE_DIR         = os.environ.get("LONGSOR_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_KEEP        = int(os.environ.get("LONGSOR_PROFILE_KEEP", "200"))
+PROFILE_INTERVAL_MS = float(os.environ.get("LONGSOR_PROFILE_INTERVAL_MS", "5"))
+ADMIN_TOKEN         = os.environ.get("LONGSOR_ADMIN_TOKEN", "")
 
 # Sensor metadata (ADEL 1 & 2)
 def mk_sensor(site, sid, lat, lon):
@@ -84,6 +147,40 @@ ICON_MAP = {
     "ON":  dict(url="warning.gif", size=ICON_SIZE, anchor=ICON_ANCHOR),
 }
 
+# Kinematika (kecepatan/percepatan/inverse-velocity), jendela dalam jam
+KIN_VEL_WINDOW_H = 6.0
+KIN_ACC_WINDOW_H = 12.0
+KIN_INV_WINDOW_H = 24.0
+KIN_MIN_VEL      = 1e-3   # satuan/jam; lantai absolut kecepatan untuk inverse velocity
+KIN_VEL_SIGMA    = 5.0    # kecepatan harus > N x galat baku slope (noise) agar 1/V dihitung
+KIN_ACC_MIN_H    = 6.0   # percepatan positif beruntun minimal N jam sebelum ToF ditampilkan
+KIN_INV_MIN_R2   = 0.9    # kualitas minimal garis regresi 1/V
+KIN_STORE_POINTS = 300    # titik seri V/A/INV_V per sensor yang dikirim lewat store ws-parsed
+# Trigger status opsional: ON bila estimasi waktu longsor (Fukuzono) < N jam lagi
+TOF_TRIGGER_H    = float(os.environ.get("LONGSOR_TOF_TRIGGER_H", "0")) or None
+
+# Deteksi anomali online per sensor (lihat anomaly.py)
+ANOM_WINDOW      = 120    # jumlah sampel jendela median/MAD
+ANOM_EWMA_ALPHA  = 0.05
+ANOM_Z           = 4.0    # |z| Welford
+ANOM_RZ          = 5.0    # |robust z| median/MAD
+ANOM_DRIFT       = 3.0    # |EWMA - mean| / std
+ANOM_MIN_SAMPLES = 30     # pemanasan sebelum alert aktif
+ANOM_HOLD_H      = 4.0    # alert memengaruhi status selama N jam
+ANOM_MIN_STD     = 0.02   # lantai std (dan MAD setara) agar sensor sangat tenang tidak terlalu sensitif
+ANOM_MIN_DEV     = 0.1    # simpangan absolut minimum (satuan data) sebelum z/robust z/drift dihitung
+# Trigger status opsional: alert statistik ikut menyalakan status ON (default hanya |nilai| > 2.0)
+ANOM_TRIGGER     = os.environ.get("LONGSOR_ANOM_TRIGGER", "0") == "1"
+
+# Uptime & gap data (lihat uptime.py)
+UPTIME_CADENCE_S        = float(os.environ.get("LONGSOR_CADENCE_S", "0")) or None  # None = estimasi otomatis
+UPTIME_GAP_FACTOR       = 3.0   # selisih > 3x kadens dianggap gap
+UPTIME_RATE_DROP_FACTOR = 1.5   # kadens terkini > 1.5x nominal = laju sampling turun
+UPTIME_DAYS             = 14    # riwayat ketersediaan harian yang disimpan
+
+# Tampilan perbandingan satu site: batas titik per sensor per sumbu (downsampling)
+SITE_MAX_POINTS = 300
+
 # Feature ketersediaan MeasureControl
 HAS_MEASURE = hasattr(dl, "MeasureControl")
 
@@ -115,19 +212,6 @@ def decide_status_from_now(last_seen: dt.datetime | None,
         return "ON"
     return "CEK"
 
-def parse_time_fields(item: dict) -> dt.datetime | None:
-    """Prioritas 'direkam'; fallback gabungan 'tanggal' + 'jam' (UTC)."""
-    import pandas as pd
-    t = item.get("direkam")
-    if t:
-        ts = pd.to_datetime(t, utc=True, errors="coerce")
-        return None if ts is None or str(ts) == "NaT" else ts.to_pydatetime()
-    tanggal, jam = item.get("tanggal"), item.get("jam")
-    if tanggal and jam:
-        ts = pd.to_datetime(f"{tanggal} {jam}", utc=True, errors="coerce")
-        return None if ts is None or str(ts) == "NaT" else ts.to_pydatetime()
-    return None
-
 def get_site_from_table(tb: str) -> str | None:
     tb = (tb or "").lower()
     if "adel_01" in tb: return "adel_01"
@@ -137,12 +221,6 @@ def get_site_from_table(tb: str) -> str | None:
     if "adel_its_02" in tb: return "adel_its_02"
     return None
 
-def to_float(x):
-    try:
-        return float(x)
-    except Exception:
-        return None
-
 
 
 
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Build aset statis: salin isi assets/ ke static_build/ dengan nama ber-fingerprint
+(hash konten) plus varian .gz dan .br (bila modul brotli tersedia), lalu tulis
+static_build/manifest.json. Dibaca oleh app.asset_url() dan dilayani oleh
+staticassets.py dengan header cache immutable.
+
+    python build_assets.py            # build ulang
+    python build_assets.py --clean    # hapus static_build/ dulu
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya gzip yang dibuat
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+OUT_DIR = os.environ.get("LONGSOR_STATIC_BUILD_DIR", os.path.join(BASE_DIR, "static_build"))
+
+# format yang sudah terkompresi tidak perlu di-gzip/brotli lagi
+SKIP_COMPRESS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff", ".woff2", ".mp3", ".ogg"}
+MIN_GAIN = 0.9  # varian disimpan hanya bila <= 90% ukuran asli
+
+mimetypes.add_type("application/geo+json", ".geojson")
+
+def fingerprint(rel: str, digest: str) -> str:
+    root, ext = os.path.splitext(rel)
+    return f"{root}.{digest}{ext}"
+
+def build(clean: bool = False) -> dict:
+    if clean and os.path.isdir(OUT_DIR):
+        shutil.rmtree(OUT_DIR)
+    files = {}
+    for dirpath, _dirs, names in os.walk(ASSETS_DIR):
+        for name in sorted(names):
+            src = os.path.join(dirpath, name)
+            rel = os.path.relpath(src, ASSETS_DIR).replace(os.sep, "/")
+            with open(src, "rb") as fh:
+                data = fh.read()
+            src_mtime = os.stat(src).st_mtime_ns
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            out_rel = fingerprint(rel, digest)
+            dst = os.path.join(OUT_DIR, *out_rel.split("/"))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, "wb") as fh:
+                fh.write(data)
+
+            # size & mtime_ns sumber: dipakai app.asset_entry() untuk mendeteksi build basi
+            entry = {"path": out_rel, "hash": digest, "size": len(data), "mtime_ns": src_mtime,
+                     "type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                     "gz": None, "br": None}
+            if os.path.splitext(name)[1].lower() not in SKIP_COMPRESS and data:
+                gz = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(gz) <= MIN_GAIN * len(data):
+                    with open(dst + ".gz", "wb") as fh:
+                        fh.write(gz)
+                    entry["gz"] = len(gz)
+                if brotli is not None:
+                    br = brotli.compress(data, quality=11)
+                    if len(br) <= MIN_GAIN * len(data):
+                        with open(dst + ".br", "wb") as fh:
+                            fh.write(br)
+                        entry["br"] = len(br)
+            files[rel] = entry
+
+    with open(os.path.join(OUT_DIR, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump({"files": files}, fh, indent=1, sort_keys=True)
+    return files
+
+def report(files: dict):
+    raw = sum(e["size"] for e in files.values())
+    gz = sum(e["gz"] or e["size"] for e in files.values())
+    br = sum(e["br"] or e["gz"] or e["size"] for e in files.values())
+    print(f"{len(files)} aset -> {OUT_DIR}")
+    print(f"  identity : {raw / 1024:10.1f} KB")
+    print(f"  gzip     : {gz / 1024:10.1f} KB ({100 * gz / raw:.0f}%)")
+    if brotli is not None:
+        print(f"  brotli   : {br / 1024:10.1f} KB ({100 * br / raw:.0f}%)")
+    else:
+        print("  brotli   : dilewati (pip install brotli)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build aset statis terkompresi + fingerprint")
+    ap.add_argument("--clean", action="store_true")
+    a = ap.parse_args()
+    report(build(clean=a.clean))
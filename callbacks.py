@@ -1,5 +1,4 @@
 # callbacks.py
-import json
 import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
@@ -8,13 +7,70 @@ import dash_leaflet as dl
 import datetime as dt
 
 from app import (
-    app, UTC,
+    app, asset_url, SITE_MAX_POINTS,
     SENSORS, STATUS_STYLE, ICON_MAP,
-    fmt_time_utc, decide_status_from_now, to_float, parse_time_fields, get_site_from_table
+    fmt_time_utc, decide_status_from_now, get_site_from_table
 )
-from layouts import graphs_layout, render_drawer_children
+from layouts import (
+    graphs_layout, kinematics_layout, site_layout, render_drawer_children, fleet_panel_children
+)
+from kinematics import KINEMATICS, tof_imminent
+from anomaly import ANOMALY, anomaly_breach, recent_alert
+from uptime import UPTIME, fleet_rows
+from protocol import decode_message, table_columns
 
 # ====================== WS -> STORE PARSER ======================
+def parse_times(direkam: pd.Series, tanggal: pd.Series, jam: pd.Series) -> pd.Series:
+    """Waktu sampel (vektor): prioritas 'direkam', fallback 'tanggal' + 'jam' (UTC)."""
+    has_rek = direkam.map(bool)
+    has_tj = ~has_rek & tanggal.map(bool) & jam.map(bool)
+    raw = direkam.where(has_rek, tanggal.astype(str) + " " + jam.astype(str)).where(has_rek | has_tj)
+    ts = pd.to_datetime(raw, utc=True, errors="coerce", format="ISO8601")
+    retry = ts.isna() & raw.notna()
+    if retry.any():
+        # format campuran: parse per elemen seperti sebelumnya
+        ts[retry] = pd.to_datetime(raw[retry], utc=True, errors="coerce", format="mixed")
+    return ts
+
+def frame_from_tables(tables: dict) -> pd.DataFrame:
+    """Gabungkan semua tabel (kolumnar atau items) jadi satu DataFrame: key, time, X, Y, Z, status."""
+    frames = []
+    for tb, content in (tables or {}).items():
+        site = get_site_from_table(tb)
+        if not site:
+            continue
+        cols = table_columns(content)
+        n = len(next(iter(cols.values()), []))
+        if not n:
+            continue
+        col = lambda name: pd.Series(cols[name], dtype=object) if name in cols else pd.Series([None] * n, dtype=object)
+        z = col("delta_z")
+        if "delya_z" in cols:
+            z = z.where(z.notna(), col("delya_z"))
+        frames.append(pd.DataFrame({
+            "key": site + ":" + col("ID").map(lambda v: str(v or "").strip().zfill(3)),
+            "time": parse_times(col("direkam"), col("tanggal"), col("jam")),
+            "X": pd.to_numeric(col("delta_x"), errors="coerce"),
+            "Y": pd.to_numeric(col("delta_y"), errors="coerce"),
+            "Z": pd.to_numeric(z, errors="coerce"),
+            "status": col("status").map(lambda v: str(v or "").upper()),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["key", "time", "X", "Y", "Z", "status"])
+    df = pd.concat(frames, ignore_index=True).dropna(subset=["time"])
+    return df.sort_values(["key", "time"], kind="stable")
+
+def iso_strings(ts: pd.Series) -> np.ndarray:
+    """ISO-8601 UTC seperti datetime.isoformat(): mikrodetik hanya bila tidak nol."""
+    ns = ts.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    base = np.datetime_as_string(ns, unit="s")
+    us = (ns.astype(np.int64) % 1_000_000_000) // 1000
+    frac = np.array([f".{u:06d}" if u else "" for u in us.tolist()], dtype=object)
+    return np.char.add(np.char.add(base.astype(str), frac.astype(str)), "+00:00")
+
+def _nullable(arr: np.ndarray) -> list:
+    return [None if v != v else v for v in arr.tolist()]
+
 @app.callback(
     Output("ws-parsed", "data"),
     Input("ws", "message"),
@@ -25,79 +81,58 @@ def on_ws_message(message):
         return no_update
     raw = message.get("data", message)
     try:
-        payload = json.loads(raw) if isinstance(raw, str) else raw
+        # JSON teks, biner kolumnar (MessagePack) atau biner ber-base64 — lihat protocol.py
+        payload = decode_message(raw)
     except Exception:
         return no_update
+    if not isinstance(payload, dict):
+        return no_update
 
     out = {"updated_at": payload.get("timestamp"), "sensors": {}}
-    tables = payload.get("tables", {})
-    cache = {}
-    for tb, content in tables.items():
-        site = get_site_from_table(tb)
-        items = (content or {}).get("items", [])
-        for it in items:
-            sid = (str(it.get("ID") or "").strip()).zfill(3)
-            if not site or not sid:
-                continue
-            cache.setdefault(f"{site}:{sid}", {"items": []})["items"].append(it)
+    df = frame_from_tables(payload.get("tables", {}))
+    if df.empty:
+        return out
 
-    for key, bundle in cache.items():
-        rows = []
-        for it in bundle["items"]:
-            ts = parse_time_fields(it)
-            if ts is None:
-                continue
-            rows.append({
-                "time": ts,
-                "X": to_float(it.get("delta_x")),
-                "Y": to_float(it.get("delta_y")),
-                "Z": to_float(it.get("delta_z") if ("delta_z" in it) else it.get("delya_z")),
-                "status": (it.get("status") or "").upper(),
-            })
-        if not rows:
-            continue
-        rows.sort(key=lambda r: r["time"])
+    keys = df["key"].to_numpy()
+    bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts, ends = np.concatenate(([0], bounds)), np.concatenate((bounds, [len(keys)]))
+    iso_all = iso_strings(df["time"])
+    epoch_all = df["time"].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    X_all, Y_all, Z_all = (df[c].to_numpy(dtype=float) for c in ("X", "Y", "Z"))
+    status_all = df["status"].to_numpy()
+
+    for i0, i1 in zip(starts.tolist(), ends.tolist()):
+        key = keys[i0]
+        times = iso_all[i0:i1].tolist()
+        xs, ys, zs = _nullable(X_all[i0:i1]), _nullable(Y_all[i0:i1]), _nullable(Z_all[i0:i1])
+        epoch = epoch_all[i0:i1].tolist()
         out["sensors"][key] = {
-            "time": [r["time"].astimezone(UTC).isoformat() for r in rows],
-            "X": [r["X"] for r in rows],
-            "Y": [r["Y"] for r in rows],
-            "Z": [r["Z"] for r in rows],
-            "last_seen": rows[-1]["time"].astimezone(UTC).isoformat(),
-            "last_status": rows[-1]["status"],
+            "time": times,
+            "X": xs,
+            "Y": ys,
+            "Z": zs,
+            "last_seen": times[-1],
+            "last_status": status_all[i1 - 1],
+            # kecepatan/percepatan/inverse-velocity, inkremental (hanya sampel baru)
+            "kin": KINEMATICS.update(key, epoch, times, xs, ys, zs),
+            # statistik online (Welford/EWMA/median-MAD) + waktu terakhir > threshold
+            "anom": ANOMALY.update(key, epoch, times, xs, ys, zs),
+            # gap, kadens & ketersediaan harian
+            "uptime": UPTIME.update(key, epoch),
         }
     return out
 
 # ====================== MARKERS (real-time) ======================
-EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
-
-def last_exceed_time(dyn: dict, key: str, thr: float = 2.0) -> dt.datetime:
-    if dyn is None:
-        return EPOCH
-    else:
-        times = dyn.get("time", [])
-        vals  = dyn.get(key, [])
-        # Cari semua indeks dengan nilai > thr
-        idxs = [i for i, v in enumerate(vals) if (v is not None) and (v > thr)]
-        if not idxs:
-            return EPOCH
-    # Ambil waktu terakhir (maks) berbasis timestamp, bukan sekadar indeks
-    # (jaga-jaga kalau data tidak terurut)
-    cand = [dt.datetime.fromisoformat(times[i].replace("Z", "+00:00")) for i in idxs]
-    return max(cand)
+def alert_text(anom: dict | None, now: dt.datetime | None = None) -> str:
+    """Alert statistik terakhir (z/robust z/drift) untuk ditampilkan; "" bila tidak ada."""
+    hit = recent_alert(anom, now)
+    if not hit:
+        return ""
+    return f"{hit[1]} • {fmt_time_utc(dt.datetime.fromisoformat(hit[0]))}"
 
-def iso_utc(dtobj: dt.datetime) -> str:
-    # Kembalikan ISO-8601 dengan akhiran Z
-    return dtobj.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    
 def make_marker_component(meta: dict, dyn: dict | None):
-    last_seen_dt, last_status_txt, has_breach = None, None, False
+    last_seen_dt, last_status_txt, has_breach, alert = None, None, False, ""
     now = dt.datetime.now(dt.timezone.utc)
-    # Terakhir melebihi threshold (terjadi longsor)
-    last_x_dt = last_exceed_time(dyn, "X", thr=2.0)
-    last_y_dt = last_exceed_time(dyn, "Y", thr=2.0)
-    last_z_dt = last_exceed_time(dyn, "Z", thr=2.0)
-    # Terakhir dari semua komponen
-    last_any_dt = max(last_x_dt, last_y_dt, last_z_dt)
 
     if dyn:
         if dyn.get("last_seen"):
@@ -106,15 +141,9 @@ def make_marker_component(meta: dict, dyn: dict | None):
             except Exception:
                 last_seen_dt = None
         last_status_txt = dyn.get("last_status")
-        try:
-            arr_x = np.array([v for v in (dyn.get("X") or []) if v is not None], dtype=float)
-            arr_y = np.array([v for v in (dyn.get("Y") or []) if v is not None], dtype=float)
-            arr_z = np.array([v for v in (dyn.get("Z") or []) if v is not None], dtype=float)
-            has_breach = ((np.any(np.abs(arr_x) > 2.0) and (now-last_any_dt) <= dt.timedelta(hours=4)) or
-                          (np.any(np.abs(arr_y) > 2.0) and (now-last_any_dt) <= dt.timedelta(hours=4)) or
-                          (np.any(np.abs(arr_z) > 2.0) and (now-last_any_dt) <= dt.timedelta(hours=4)))
-        except Exception:
-            has_breach = False
+        # sudah dihitung inkremental saat ingest (threshold 2.0, opsional z-score/MAD/drift)
+        has_breach = anomaly_breach(dyn.get("anom"), now) or tof_imminent(dyn.get("kin"), now)
+        alert = alert_text(dyn.get("anom"), now)
 
     status_now = decide_status_from_now(last_seen_dt, has_breach, last_status_txt, stale_hours=8)
     cfg = STATUS_STYLE[status_now]
@@ -138,6 +167,8 @@ def make_marker_component(meta: dict, dyn: dict | None):
             ),
             html.Div(["Terakhir diterima: ", html.Strong(last_txt)],
                      style={"marginTop": "4px", "color": "#444"}),
+            html.Div(["Anomali: ", html.Strong(alert)],
+                     style={"marginTop": "2px", "color": "#b45309", "fontSize": "12px"}) if alert else None,
             html.Div(f"ID: {meta['sid']} • Site: {meta['site']}",
                      style={"marginTop": "2px", "color": "#666", "fontSize": "12px"}),
             html.Div(f"Koordinat: {meta['lat']:.6f}, {meta['lon']:.6f}",
@@ -150,7 +181,7 @@ def make_marker_component(meta: dict, dyn: dict | None):
         id={"type": "sensor-marker", "sensor_id": meta["id"]},
         position=[meta["lat"], meta["lon"]],
         icon=dict(
-            iconUrl=app.get_asset_url(icon_cfg["url"]),
+            iconUrl=asset_url(icon_cfg["url"]),
             iconSize=icon_cfg["size"],
             iconAnchor=icon_cfg["anchor"],
             popupAnchor=[0, -icon_cfg["anchor"][1] + 6],
@@ -173,6 +204,39 @@ def refresh_markers(ws_data, _tick):
         children.append(make_marker_component(meta, dyn))
     return children
 
+# ====================== FLEET OVERVIEW ======================
+app.clientside_callback(
+    """
+    function(n, open_state){
+        if (typeof n === 'number' && n > 0) {
+            return !open_state;
+        }
+        return open_state;
+    }
+    """,
+    Output("fleet-open", "data"),
+    Input("fleet-toggle", "n_clicks"),
+    State("fleet-open", "data"),
+    prevent_initial_call=True
+)
+
+@app.callback(
+    Output("fleet-panel", "children"),
+    Output("fleet-panel", "style"),
+    Input("fleet-open", "data"),
+    Input("ws-parsed", "data"),
+    Input("status-interval", "n_intervals"),
+    State("fleet-panel", "style"),
+)
+def render_fleet(is_open, ws_data, _tick, style):
+    style = dict(style or {})
+    if not is_open:
+        style["display"] = "none"
+        return [], style
+    style["display"] = "block"
+    sensor_map = (ws_data or {}).get("sensors", {}) if ws_data else {}
+    return fleet_panel_children(fleet_rows(SENSORS, sensor_map)), style
+
 # ====================== DRAWER EVENTS ======================
 @app.callback(
     Output("drawer-open", "data"),
@@ -206,13 +270,14 @@ def update_drawer(is_open, selected, style, x_range, ws_data):
     style = style or {}
     if is_open and selected:
         df, last_seen, last_status_txt = df_from_ws(ws_data, selected["site"], selected["sid"])
-        has_breach = False
-        if not df.empty and (df[["X","Y","Z"]].abs() > 2.0).any(axis=1).tail(50).any():
-            has_breach = True
+        dyn = dyn_from_ws(ws_data, selected["site"], selected["sid"])
+        # aturan sama dengan marker: hasil ingest (|nilai| > 2.0 dalam ANOM_HOLD_H jam, opsional statistik)
+        has_breach = anomaly_breach(dyn.get("anom")) or tof_imminent(dyn.get("kin"))
         status = decide_status_from_now(last_seen, has_breach, last_status_txt, stale_hours=8)
         last_txt = fmt_time_utc(last_seen)
         initial_content = graphs_layout(selected["name"], df, x_range=x_range,
-                                        status_text=status, last_seen_text=last_txt)
+                                        status_text=status, last_seen_text=last_txt,
+                                        alert_text=alert_text(dyn.get("anom")))
         style.update({
             "width": "420px",
             "borderLeft": "1px solid #e5e7eb",
@@ -309,6 +374,63 @@ def df_from_ws(ws_data: dict | None, site: str, sid: str):
             last_seen = None
     return df, last_seen, s.get("last_status")
 
+def site_frame(ws_data: dict | None, site: str, max_points: int = SITE_MAX_POINTS) -> pd.DataFrame:
+    """Semua sensor satu site dalam satu query: waktu disejajarkan ke bin bersama & di-downsample.
+
+    Hasil: DataFrame lebar ber-index waktu, kolom MultiIndex (komponen, sid).
+    Tiap bin diwakili nilai min & max-nya (urut sesuai kejadian, di awal & tengah bin)
+    agar lonjakan/pelanggaran threshold tidak hilang; maksimal `max_points` titik per sensor.
+    """
+    sensors = (ws_data or {}).get("sensors") or {}
+    keys = sorted(k for k in sensors if k.startswith(f"{site}:"))
+    lens = [len(sensors[k].get("time") or []) for k in keys]
+    if not keys or not sum(lens):
+        return pd.DataFrame()
+    long = pd.DataFrame({
+        "time": pd.to_datetime(np.concatenate([sensors[k].get("time") or [] for k in keys]), utc=True, errors="coerce"),
+        "sid": np.repeat([k.split(":", 1)[1] for k in keys], lens),
+        **{c: np.concatenate([np.asarray(sensors[k].get(c) or [], dtype=float) for k in keys]) for c in ("X", "Y", "Z")},
+    }).dropna(subset=["time"]).reset_index(drop=True)
+    if long.empty:
+        return pd.DataFrame()
+    span_s = (long["time"].max() - long["time"].min()).total_seconds()
+    bin_s = max(60, int(np.ceil(span_s / max(1, max_points // 2 - 1))))
+    long["bin"] = long["time"].dt.floor(f"{bin_s}s")
+    half = pd.Timedelta(seconds=bin_s / 2)
+    parts = []
+    for c in ("X", "Y", "Z"):
+        grp = long.dropna(subset=[c]).groupby(["bin", "sid"])[c]
+        if not grp.ngroups:
+            continue
+        i_min, i_max = grp.idxmin().to_numpy(), grp.idxmax().to_numpy()
+        # baris long terurut waktu per sensor -> indeks kecil = kejadian lebih dulu
+        first, second = np.minimum(i_min, i_max), np.maximum(i_min, i_max)
+        bins = long["bin"].to_numpy()[first]
+        sids = long["sid"].to_numpy()[first]
+        vals = long[c].to_numpy()
+        parts.append(pd.DataFrame({"time": np.concatenate([bins, bins + half]),
+                                   "sid": np.concatenate([sids, sids]),
+                                   "comp": c,
+                                   "v": np.concatenate([vals[first], vals[second]])}))
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts).pivot_table(index="time", columns=["comp", "sid"], values="v", aggfunc="first").sort_index()
+
+def dyn_from_ws(ws_data: dict | None, site: str, sid: str) -> dict:
+    """Entri mentah sensor di store ws-parsed (termasuk hasil ingest "kin"/"anom")."""
+    if not ws_data:
+        return {}
+    return (ws_data.get("sensors") or {}).get(f"{site}:{sid}") or {}
+
+def kin_df(kin: dict | None) -> pd.DataFrame:
+    ser = (kin or {}).get("series") or {}
+    if not ser.get("time"):
+        return pd.DataFrame(columns=["time","V","A","INV_V"])
+    return pd.DataFrame({"time": pd.to_datetime(ser["time"], utc=True, errors="coerce"),
+                         "V": pd.to_numeric(ser["V"], errors="coerce"),
+                         "A": pd.to_numeric(ser["A"], errors="coerce"),
+                         "INV_V": pd.to_numeric(ser["INV_V"], errors="coerce")}).dropna(subset=["time"])
+
 @app.callback(
     Output("tab-content", "children"),
     Input("sensor-tabs", "value"),
@@ -322,12 +444,15 @@ def render_tab(active_tab, ws_data, _tick, selected, x_range):
     if not selected:
         return html.Div()
     df, last_seen, last_status_txt = df_from_ws(ws_data, selected["site"], selected["sid"])
-    has_breach = (not df.empty) and (df[["X","Y","Z"]].abs() > 2.0).any(axis=1).tail(50).any()
+    dyn = dyn_from_ws(ws_data, selected["site"], selected["sid"])
+    kin = dyn.get("kin")
+    has_breach = anomaly_breach(dyn.get("anom")) or tof_imminent(kin)
     status = decide_status_from_now(last_seen, has_breach, last_status_txt, stale_hours=8)
     last_txt = fmt_time_utc(last_seen)
 
     if active_tab == "tab-graph":
-        return graphs_layout(selected["name"], df, x_range=x_range, status_text=status, last_seen_text=last_txt)
+        return graphs_layout(selected["name"], df, x_range=x_range, status_text=status, last_seen_text=last_txt,
+                             alert_text=alert_text(dyn.get("anom")))
     elif active_tab == "tab-table":
         if df.empty:
             return html.Div("Tidak ada data untuk ditampilkan.", style={"padding":"8px","color":"#555"})
@@ -368,5 +493,11 @@ def render_tab(active_tab, ws_data, _tick, selected, x_range):
             layout=go.Layout(margin=dict(l=0,r=0,t=10,b=0), height=360)
         )
         return html.Div(dcc.Graph(figure=fig), style={"height": "100%", "overflow": "auto"})
+    elif active_tab == "tab-site":
+        return site_layout(selected["site"], site_frame(ws_data, selected["site"]), x_range=x_range)
+    elif active_tab == "tab-kin":
+        tof_txt = fmt_time_utc(pd.to_datetime(kin["tof"], utc=True).to_pydatetime()) if kin and kin.get("tof") else "—"
+        return kinematics_layout(selected["name"], kin_df(kin), x_range=x_range, tof_text=tof_txt,
+                                 v_last=(kin or {}).get("v_last"), a_last=(kin or {}).get("a_last"))
     return html.Div()
 
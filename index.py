@@ -8,6 +8,9 @@ Created on Tue Mar 16 15:09:01 2021
 from app import app, server  # server diekspos untuk gunicorn
 from layouts import build_layout  # fungsi penyusun layout
 import callbacks  # mendaftarkan semua callback
+import tileproxy  # route /tiles (aktif bila LONGSOR_TILE_PROXY=1)
+import staticassets  # aset terkompresi/fingerprint (bila static_build/ ada)
+import profiling  # profiling callback opt-in + route /_admin/profiles
 
 # set layout
 app.layout = build_layout()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Kinematika pergerakan per sensor: kecepatan, percepatan, dan inverse-velocity
+(metode Fukuzono) untuk estimasi waktu longsor (time of failure).
+
+Dihitung inkremental saat ingest (on_ws_message): setiap sampel baru
+diproses sekali dengan biaya O(1) (amortized) lewat regresi linier bergeser
+berbasis jumlah berjalan; sampel yang sudah pernah diproses tidak dihitung ulang.
+"""
+
+import datetime as dt
+import math
+import threading
+from collections import deque
+
+from app import (
+    KIN_VEL_WINDOW_H, KIN_ACC_WINDOW_H, KIN_INV_WINDOW_H, KIN_MIN_VEL, KIN_VEL_SIGMA,
+    KIN_ACC_MIN_H, KIN_INV_MIN_R2, KIN_STORE_POINTS, TOF_TRIGGER_H
+)
+
+class RollingSlope:
+    """Regresi linier y = a*t + b pada jendela waktu bergeser (t dalam jam).
+
+    Menyimpan Σt, Σy, Σt², Σty, Σy² relatif terhadap t_ref; push/evict O(1).
+    t_ref digeser berkala (rebase) agar jumlah berjalan tetap presisi.
+    """
+
+    def __init__(self, window_h: float):
+        self.window = float(window_h)
+        self.buf = deque()
+        self.t_ref = None
+        self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+
+    def __len__(self):
+        return len(self.buf)
+
+    def _add(self, t, y, sign):
+        u = t - self.t_ref
+        self.st += sign * u
+        self.sy += sign * y
+        self.stt += sign * u * u
+        self.sty += sign * u * y
+        self.syy += sign * y * y
+
+    def _rebase(self):
+        self.t_ref = self.buf[0][0]
+        self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+        for t, y in self.buf:
+            self._add(t, y, +1)
+
+    def push(self, t: float, y: float):
+        if self.t_ref is None:
+            self.t_ref = t
+        self.buf.append((t, y))
+        self._add(t, y, +1)
+        while self.buf and self.buf[0][0] < t - self.window:
+            t0, y0 = self.buf.popleft()
+            self._add(t0, y0, -1)
+        if t - self.t_ref > 10 * self.window:
+            self._rebase()
+
+    def slope(self) -> float | None:
+        n = len(self.buf)
+        if n < 2:
+            return None
+        denom = n * self.stt - self.st * self.st
+        if denom <= 1e-12:
+            return None
+        return (n * self.sty - self.st * self.sy) / denom
+
+    def _centered(self):
+        n = len(self.buf)
+        sxx = self.stt - self.st * self.st / n
+        sxy = self.sty - self.st * self.sy / n
+        syy = max(0.0, self.syy - self.sy * self.sy / n)
+        return sxx, sxy, syy
+
+    def stderr(self) -> float | None:
+        """Galat baku slope (ukuran noise); None bila < 3 titik."""
+        n = len(self.buf)
+        a = self.slope()
+        if n < 3 or a is None:
+            return None
+        sxx, sxy, syy = self._centered()
+        return math.sqrt(max(0.0, syy - a * sxy) / (n - 2) / sxx)
+
+    def r2(self) -> float | None:
+        a = self.slope()
+        if a is None:
+            return None
+        _sxx, sxy, syy = self._centered()
+        return min(1.0, a * sxy / syy) if syy > 1e-12 else None
+
+    def root(self) -> float | None:
+        """t saat garis regresi memotong y = 0 (None bila slope tidak tersedia/0)."""
+        a = self.slope()
+        if not a:
+            return None
+        b = (self.sy - a * self.st) / len(self.buf)
+        return self.t_ref - b / a
+
+class SensorKinematics:
+    """State per sensor. Displacement = resultan sqrt(X² + Y² + Z²)."""
+
+    def __init__(self, vel_h=KIN_VEL_WINDOW_H, acc_h=KIN_ACC_WINDOW_H, inv_h=KIN_INV_WINDOW_H,
+                 min_vel=KIN_MIN_VEL):
+        self.vel = RollingSlope(vel_h)
+        self.acc = RollingSlope(acc_h)
+        self.inv_h = inv_h
+        self.inv = RollingSlope(inv_h)
+        self.min_vel = min_vel
+        self.acc_since = None       # jam sejak percepatan positif tanpa putus
+        self.last_t = None
+        # (epoch_s, iso, V, A, INV_V)
+        self.series = deque()
+        self.v_last = self.a_last = None
+        self.tof_h = None
+
+    def push(self, t_s: float, iso: str, x, y, z):
+        comps = [c for c in (x, y, z) if c is not None and not math.isnan(c)]
+        self.last_t = t_s
+        if not comps:
+            return
+        t_h = t_s / 3600.0
+        self.vel.push(t_h, math.sqrt(sum(c * c for c in comps)))
+        v = self.vel.slope()
+        a = iv = None
+        if v is not None:
+            self.acc.push(t_h, v)
+            a = self.acc.slope()
+        # 1/V hanya bermakna selama gerakan nyata (di atas noise); selain itu fase akselerasi putus
+        v_floor = max(self.min_vel, KIN_VEL_SIGMA * (self.vel.stderr() or 0.0))
+        if v is not None and v > v_floor:
+            iv = 1.0 / v
+            self.inv.push(t_h, iv)
+        elif len(self.inv):
+            self.inv = RollingSlope(self.inv_h)
+        if a is not None and a > 0:
+            self.acc_since = t_h if self.acc_since is None else self.acc_since
+        else:
+            self.acc_since = None
+        self.tof_h = self._time_of_failure(t_h)
+        self.v_last, self.a_last = v, a
+        self.series.append((t_s, iso, v, a, iv))
+
+    def _time_of_failure(self, t_h: float) -> float | None:
+        """Fukuzono: akar garis 1/V, hanya bila percepatan positif bertahan & garis cukup lurus."""
+        if len(self.inv) < 3 or self.acc_since is None or t_h - self.acc_since < KIN_ACC_MIN_H:
+            return None
+        slope, r2 = self.inv.slope(), self.inv.r2()
+        if slope is None or slope >= 0 or r2 is None or r2 < KIN_INV_MIN_R2:
+            return None
+        root = self.inv.root()
+        return root if root is not None and root > t_h else None
+
+    def snapshot(self) -> dict:
+        """Nilai terakhir + seri V/A/INV_V yang dijarangkan (maks. KIN_STORE_POINTS titik).
+
+        Seri ikut disimpan di ws-parsed supaya tab Kinematika tidak bergantung
+        pada state tracker di worker yang kebetulan melayani callback-nya.
+        """
+        r = lambda v: None if v is None else round(v, 6)
+        n = len(self.series)
+        step = max(1, math.ceil(n / KIN_STORE_POINTS))
+        # titik terakhir selalu ikut agar ujung grafik = v_last/a_last
+        rows = list(self.series)[(n - 1) % step::step] if n else []
+        tof = None
+        if self.tof_h is not None:
+            try:
+                tof = dt.datetime.fromtimestamp(self.tof_h * 3600.0, dt.timezone.utc).isoformat()
+            except (OverflowError, OSError, ValueError):
+                tof = None
+        return {
+            "series": {
+                "time":  [s[1] for s in rows],
+                "V":     [r(s[2]) for s in rows],
+                "A":     [r(s[3]) for s in rows],
+                "INV_V": [r(s[4]) for s in rows],
+            },
+            "v_last": r(self.v_last),
+            "a_last": r(self.a_last),
+            "tof": tof,
+        }
+
+class KinematicsTracker:
+    """Registry state per `site:sid`; aman dipakai bersama oleh banyak sesi/thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict[str, SensorKinematics] = {}
+
+    def update(self, key: str, times: list[float], isos: list[str], X, Y, Z) -> dict:
+        """Proses hanya sampel dengan waktu > sampel terakhir yang sudah diproses.
+
+        `times` (epoch detik) harus terurut naik. Seri turunan dipangkas
+        mengikuti jendela data yang sedang dikirim upstream.
+        """
+        with self._lock:
+            st = self._state.get(key)
+            if st is None:
+                st = self._state[key] = SensorKinematics()
+            for i, t in enumerate(times):
+                if st.last_t is not None and t <= st.last_t:
+                    continue
+                st.push(t, isos[i], X[i], Y[i], Z[i])
+            if times:
+                while st.series and st.series[0][0] < times[0]:
+                    st.series.popleft()
+            return st.snapshot()
+
+KINEMATICS = KinematicsTracker()
+
+def tof_imminent(kin: dict | None, now: dt.datetime | None = None) -> bool:
+    """Trigger status opsional: estimasi time-of-failure dalam TOF_TRIGGER_H jam ke depan."""
+    if not TOF_TRIGGER_H or not kin or not kin.get("tof"):
+        return False
+    if (kin.get("a_last") or 0.0) <= 0.0:
+        return False
+    now = now or dt.datetime.now(dt.timezone.utc)
+    tof = dt.datetime.fromisoformat(kin["tof"])
+    return now <= tof <= now + dt.timedelta(hours=TOF_TRIGGER_H)
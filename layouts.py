@@ -7,15 +7,14 @@ from dash_extensions.javascript import arrow_function
 from dash import html, dcc
 
 from app import (
-    app, WS_URL, HAS_MEASURE,
-    OSM, ESRI_WORLD_IMAGERY, ESRI_WORLD_STREET, ESRI_NATGEO, ESRI_WORLD_TOPO,
-    ATTR_OSM, ATTR_ESRI, ICON_SIZE, ICON_MAP
+    WS_URL, HAS_MEASURE, asset_url,
+    tile_url, ATTR_OSM, ATTR_ESRI, ICON_SIZE, ICON_MAP
 )
 
 # =============== HEADER & FOOTER ===============
 header = html.Div(
     [
-        html.Img(src="/assets/its.png", style={"height": "48px", "marginRight": "12px"}),
+        html.Img(src=asset_url("its.png"), style={"height": "48px", "marginRight": "12px"}),
         html.Div("SISTEM MONITORING LONGSOR",
                  style={"fontWeight": 700, "fontSize": "20px", "color": "#000"})
     ],
@@ -58,7 +57,7 @@ def make_fault_overlay(filename: str, layer_id: str, display_name: str,
         checked=checked,
         children=dl.GeoJSON(
             id=layer_id,
-            url=app.get_asset_url(f'faults/{filename}'),
+            url=asset_url(f'faults/{filename}'),
             options=dict(style=style, onEachFeature=popup_on_each_feature(display_name)),
             hoverStyle={"weight": 4, "opacity": 1.0},
         )
@@ -80,7 +79,7 @@ def legend_item_line(label: str, color: str, dashed: bool = False):
 def legend_control():
     def icon_img(filename):
         return html.Img(
-            src=app.get_asset_url(filename),
+            src=asset_url(filename),
             style={"width": f"{ICON_SIZE[0]}px", "height": f"{ICON_SIZE[1]}px", "marginRight": "6px"}
         )
     return html.Div(
@@ -123,19 +122,19 @@ def legend_control():
 # =============== MAP ===============
 layers_control = dl.LayersControl(position="topright", children=[
     dl.BaseLayer(name="ESRI World Imagery (default)", checked=True, children=[
-        dl.TileLayer(url=ESRI_WORLD_IMAGERY, attribution=ATTR_ESRI)
+        dl.TileLayer(url=tile_url("esri_imagery"), attribution=ATTR_ESRI)
     ]),
     dl.BaseLayer(name="ESRI World Street Map", children=[
-        dl.TileLayer(url=ESRI_WORLD_STREET, attribution=ATTR_ESRI)
+        dl.TileLayer(url=tile_url("esri_street"), attribution=ATTR_ESRI)
     ]),
     dl.BaseLayer(name="ESRI NatGeo World Map", children=[
-        dl.TileLayer(url=ESRI_NATGEO, attribution=ATTR_ESRI)
+        dl.TileLayer(url=tile_url("esri_natgeo"), attribution=ATTR_ESRI)
     ]),
     dl.BaseLayer(name="ESRI World Topo Map", children=[
-        dl.TileLayer(url=ESRI_WORLD_TOPO, attribution=ATTR_ESRI)
+        dl.TileLayer(url=tile_url("esri_topo"), attribution=ATTR_ESRI)
     ]),
     dl.BaseLayer(name="OpenStreetMap", children=[
-        dl.TileLayer(url=OSM, attribution=ATTR_OSM)
+        dl.TileLayer(url=tile_url("osm"), attribution=ATTR_OSM)
     ]),
 
     # Fault overlays
@@ -167,7 +166,7 @@ marker_layer = dl.LayerGroup(id="marker-layer", children=[])
 marker_layer2 = dl.Marker(
             position=[-7.991325, 111.738081],
             icon=dict(
-                iconUrl=app.get_asset_url("its.png"),
+                iconUrl=asset_url("its.png"),
                 iconSize=[30, 30],
                 iconAnchor=[15, 30]),
             children=[
@@ -184,14 +183,17 @@ the_map = dl.Map(
 )
 
 # =============== DRAWER & GRAFIK ===============
-def graphs_layout(sensor_name, df, x_range=None, status_text="", last_seen_text=""):
+def graphs_layout(sensor_name, df, x_range=None, status_text="", last_seen_text="", alert_text=""):
     header_box = html.Div(
         [html.Div([html.Span("Status: ", style={"fontWeight": 600}),
                    html.Span(status_text or "-"),
                    html.Span(" • ", style={"padding":"0 6px","color":"#999"}),
                    html.Span("Terakhir: ", style={"fontWeight": 600}),
                    html.Span(last_seen_text or "-")],
-                  style={"fontSize":"12px"})],
+                  style={"fontSize":"12px"}),
+         html.Div([html.Span("Anomali statistik: ", style={"fontWeight": 600}),
+                   html.Span(alert_text)],
+                  style={"fontSize":"12px","marginTop":"2px","color":"#b45309"}) if alert_text else None],
         style={"padding":"6px 8px","background":"#f8fafc","border":"1px solid #e5e7eb",
                "borderRadius":"8px","marginBottom":"8px"}
     )
@@ -246,6 +248,84 @@ def graphs_layout(sensor_name, df, x_range=None, status_text="", last_seen_text=
         return html.Div([header_box, empty, graphs], style={"height":"100%"})
     return html.Div([header_box, graphs], style={"height":"100%"})
 
+def kinematics_layout(sensor_name, df, x_range=None, tof_text="", v_last=None, a_last=None):
+    """Kecepatan, percepatan & inverse-velocity (Fukuzono) dari resultan displacement."""
+    fmt = lambda v: "-" if v is None else f"{v:.4f}"
+    header_box = html.Div(
+        [html.Div([html.Span("V: ", style={"fontWeight": 600}), html.Span(f"{fmt(v_last)} /jam"),
+                   html.Span(" • ", style={"padding":"0 6px","color":"#999"}),
+                   html.Span("A: ", style={"fontWeight": 600}), html.Span(f"{fmt(a_last)} /jam²")],
+                  style={"fontSize":"12px"}),
+         html.Div([html.Span("Estimasi waktu longsor (1/V): ", style={"fontWeight": 600}),
+                   html.Span(tof_text or "-")],
+                  style={"fontSize":"12px","marginTop":"2px"})],
+        style={"padding":"6px 8px","background":"#f8fafc","border":"1px solid #e5e7eb",
+               "borderRadius":"8px","marginBottom":"8px"}
+    )
+
+    def make_fig(col, title):
+        fig = go.Figure()
+        sub = df[["time", col]].dropna() if not df.empty else df
+        fig.add_trace(go.Scatter(x=sub["time"] if not sub.empty else [],
+                                 y=sub[col] if not sub.empty else [], mode="lines", name=title))
+        if x_range and x_range.get("start") and x_range.get("end"):
+            fig.update_xaxes(range=[x_range["start"], x_range["end"]])
+        else:
+            fig.update_xaxes(autorange=True)
+        fig.update_layout(
+            title=dict(text=f"{sensor_name} • {title}", font=dict(size=12)),
+            margin=dict(l=40, r=10, t=24, b=18),
+            xaxis_title=dict(text="Waktu (UTC)", font=dict(size=12)), yaxis_title=dict(text=title, font=dict(size=12)),
+            uirevision="keep", showlegend=False,
+        )
+        return fig
+
+    graphs = html.Div(
+        [dcc.Graph(id={"type": "kin-graph", "axis": col},
+                   figure=make_fig(col, title),
+                   style={"height": "33.333%", "flex": "1 1 0", "minHeight": 0},
+                   config={"responsive": True})
+         for col, title in (("V", "Kecepatan"), ("A", "Percepatan"), ("INV_V", "1 / Kecepatan"))],
+        style={"display": "flex", "flexDirection": "column", "gap": "8px", "height": "85%"}
+    )
+    return html.Div([header_box, graphs], style={"height":"100%"})
+
+def site_layout(site, wide, x_range=None):
+    """Overlay semua sensor satu site pada sumbu X/Y/Z bersama (`wide` dari site_frame)."""
+    site_name = (site or "").replace("_", " ").upper()
+
+    def make_fig(col):
+        fig = go.Figure()
+        if not wide.empty and col in wide.columns.get_level_values(0):
+            sub = wide[col]
+            for sid in sub.columns:
+                fig.add_trace(go.Scatter(x=sub.index, y=sub[sid], mode="lines", name=sid))
+            fig.add_trace(go.Scatter(x=[sub.index.min(), sub.index.max()], y=[2.0, 2.0], mode="lines",
+                                     name="Threshold = 2", line=dict(dash="dash", color="#dc2626")))
+        if x_range and x_range.get("start") and x_range.get("end"):
+            fig.update_xaxes(range=[x_range["start"], x_range["end"]])
+        else:
+            fig.update_xaxes(autorange=True)
+        fig.update_layout(
+            title=dict(text=f"{site_name} • {col}", font=dict(size=12)),
+            margin=dict(l=40, r=10, t=24, b=18),
+            xaxis_title=dict(text="Waktu (UTC)", font=dict(size=12)), yaxis_title=dict(text=f"Nilai {col}", font=dict(size=12)),
+            uirevision="keep",
+            legend=dict(font=dict(size=9), bgcolor="rgba(255,255,255,0.6)"),
+        )
+        return fig
+
+    if wide.empty:
+        return html.Div("Tidak ada data untuk site ini.", style={"padding":"8px","color":"#555"})
+    return html.Div(
+        [dcc.Graph(id={"type": "site-graph", "axis": col},
+                   figure=make_fig(col),
+                   style={"height": "33.333%", "flex": "1 1 0", "minHeight": 0},
+                   config={"responsive": True})
+         for col in ("X", "Y", "Z")],
+        style={"display": "flex", "flexDirection": "column", "gap": "8px", "height": "95%"}
+    )
+
 def render_drawer_children(sensor_name: str, initial_content):
     return [
         html.Div(
@@ -261,7 +341,9 @@ def render_drawer_children(sensor_name: str, initial_content):
             [dcc.Tabs(id="sensor-tabs", value="tab-graph",
                       children=[dcc.Tab(label="Grafik X/Y/Z", value="tab-graph"),
                                 dcc.Tab(label="Tabel Nilai", value="tab-table"),
-                                dcc.Tab(label="Log > Threshold", value="tab-log")],
+                                dcc.Tab(label="Log > Threshold", value="tab-log"),
+                                dcc.Tab(label="Kinematika", value="tab-kin"),
+                                dcc.Tab(label="Situs", value="tab-site")],
                       style={"fontSize":"13px"}),
              html.Div(id="tab-content", style={"padding":"10px","height":"calc(100% - 44px)","overflow":"hidden"},
                       children=initial_content)],
@@ -269,6 +351,57 @@ def render_drawer_children(sensor_name: str, initial_content):
         ),
     ]
 
+def fleet_panel_children(rows: list[dict]):
+    """Tabel ringkas ketersediaan per sensor (hasil uptime.fleet_rows)."""
+    def pct_color(v):
+        return "#16a34a" if v >= 95 else ("#d97706" if v >= 80 else "#dc2626")
+
+    th_style = {"textAlign": "left", "padding": "3px 6px", "borderBottom": "1px solid #e5e7eb"}
+    td_style = {"padding": "3px 6px", "borderBottom": "1px solid #f3f4f6"}
+    header_row = html.Tr([html.Th(h, style=th_style)
+                          for h in ["Sensor", "Hari ini", "7 hari", "Gap", "Kadens", "Catatan"]])
+    body = []
+    for r in rows:
+        notes = []
+        if not r["has_data"]:
+            notes.append("tidak ada data")
+        if r["rate_drop"]:
+            notes.append("laju turun")
+        if r["open_gap_s"]:
+            notes.append(f"gap {r['open_gap_s'] / 3600:.1f} jam")
+        body.append(html.Tr([
+            html.Td(r["name"], style=td_style),
+            html.Td(f"{r['today']:.1f}%", style={**td_style, "color": pct_color(r["today"])}),
+            html.Td(f"{r['avg']:.1f}%", style={**td_style, "color": pct_color(r["avg"])}),
+            html.Td(str(r["n_gaps"]), style=td_style),
+            html.Td("-" if r["cadence_s"] is None else f"{r['cadence_s'] / 60:.0f} mnt", style=td_style),
+            html.Td(", ".join(notes) or "-", style={**td_style, "color": "#b45309" if notes else "#666"}),
+        ]))
+    avg_all = sum(r["avg"] for r in rows) / len(rows) if rows else 0.0
+    return [
+        html.Div(f"Ringkasan Armada • rata-rata 7 hari {avg_all:.1f}%",
+                 style={"fontWeight": 700, "marginBottom": "6px", "fontSize": "12px"}),
+        html.Table([html.Thead(header_row), html.Tbody(body)],
+                   style={"borderCollapse": "collapse", "fontSize": "11px", "width": "100%"}),
+    ]
+
+fleet_toggle = html.Button(
+    "Ringkasan Armada", id="fleet-toggle", n_clicks=0,
+    style={"position": "absolute", "right": "12px", "bottom": "56px", "zIndex": 1000,
+           "border": "1px solid #e5e7eb", "background": "#fff", "borderRadius": "8px",
+           "padding": "4px 10px", "fontSize": "12px", "cursor": "pointer",
+           "boxShadow": "0 2px 6px rgba(0,0,0,0.08)"}
+)
+
+fleet_panel = html.Div(
+    id="fleet-panel",
+    style={"display": "none", "position": "absolute", "right": "12px", "bottom": "92px", "zIndex": 1000,
+           "backgroundColor": "rgba(255,255,255,0.96)", "padding": "10px 12px",
+           "border": "1px solid #e5e7eb", "borderRadius": "8px",
+           "boxShadow": "0 2px 6px rgba(0,0,0,0.08)", "color": "#111",
+           "maxHeight": "60vh", "overflowY": "auto", "minWidth": "420px"}
+)
+
 def drawer_container(open_: bool, children=None):
     return html.Div(
         id="drawer",
@@ -294,6 +427,9 @@ def build_layout():
                 [
                     html.Div([the_map], style={"position": "relative", "height": "100%"}),
                     legend_control(),
+                    fleet_toggle,
+                    fleet_panel,
+                    dcc.Store(id="fleet-open", data=False),
                     drawer_container(open_=False),
                     dcc.Store(id="drawer-open", data=False),
                     dcc.Store(id="selected-sensor", data=None),
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+Harness rekam & putar-ulang untuk uji beban dashboard tanpa menyentuh
+server upstream (websocket-server-v2.onrender.com).
+
+Contoh:
+    # 1) rekam pesan upstream ke disk (JSON lines)
+    python loadtest.py record --out rekaman.jsonl --count 20
+
+    # 2) server WS lokal: putar ulang rekaman 10x lebih cepat ...
+    python loadtest.py serve --replay rekaman.jsonl --speedup 10 --loop
+    #    ... atau sintesis payload (skema tables/items) untuk 200 sensor
+    python loadtest.py serve --sensors 200 --interval 60 --speedup 60
+    #    ... dalam format biner kolumnar (lihat protocol.py), tanpa permessage-deflate
+    python loadtest.py serve --format msgpack-b64 --no-deflate
+
+    # 3) dashboard diarahkan ke server lokal
+    LONGSOR_WS_URL=ws://127.0.0.1:8765/ws python index.py
+
+    # 4) simulasi N sesi dashboard (HTTP ke Dash, atau --inprocess)
+    python loadtest.py drive --dash http://127.0.0.1:8050 --sessions 20 --duration 60
+
+    # 5) regresi format pesan: JSON / msgpack / base64 -> ws-parsed identik
+    python loadtest.py check
+
+Setiap sesi menerima pesan dari server WS lokal lalu memanggil callback
+on_ws_message -> refresh_markers -> update_drawer -> render_tab -> render_fleet
+lewat endpoint /_dash-update-component, persis seperti browser.
+"""
+
+import argparse
+import base64
+import datetime as dt
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from websockets.sync.client import connect as ws_connect
+from websockets.sync.server import serve as ws_serve
+
+UPSTREAM_WS = "wss://websocket-server-v2.onrender.com/ws?days=3"
+UTC = dt.timezone.utc
+
+# =============== RECORD ===============
+def record(url: str, out_path: str, count: int | None = None, duration: float | None = None):
+    """Simpan setiap pesan upstream sebagai satu baris {"t": detik_relatif, "data": ...}."""
+    t0 = time.monotonic()
+    n = 0
+    with ws_connect(url, max_size=None, open_timeout=30) as ws, open(out_path, "w", encoding="utf-8") as fh:
+        while True:
+            if count is not None and n >= count:
+                break
+            remaining = None if duration is None else duration - (time.monotonic() - t0)
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                msg = ws.recv(timeout=remaining)
+            except TimeoutError:
+                break
+            rec = {"t": round(time.monotonic() - t0, 3)}
+            if isinstance(msg, bytes):
+                rec["data_b64"] = base64.b64encode(msg).decode("ascii")
+            else:
+                rec["data"] = msg
+            fh.write(json.dumps(rec) + "\n")
+            n += 1
+            print(f"[record] #{n} t={rec['t']:.1f}s {len(msg)} bytes")
+    return n
+
+def load_recording(path: str) -> list[tuple[float, str | bytes]]:
+    msgs = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            data = base64.b64decode(rec["data_b64"]) if "data_b64" in rec else rec["data"]
+            msgs.append((float(rec.get("t", 0.0)), data))
+    return msgs
+
+# =============== SYNTHETIC FEED ===============
+SITES = ("adel_its_01", "adel_its_02")
+
+class SyntheticFeed:
+    """Payload sintetis berskema sama dengan upstream: {"timestamp", "tables": {tb: {"items": [...]}}}.
+
+    Jam simulasi berjalan `speedup` kali lebih cepat dari jam dinding; setiap
+    `interval` detik simulasi tiap sensor mendapat satu sampel baru, dan payload
+    memuat riwayat `history_hours` terakhir (mirip ?days=N di upstream).
+    """
+
+    def __init__(self, n_sensors=12, interval=60.0, speedup=1.0, history_hours=72.0,
+                 spike_prob=0.002, seed=0):
+        self.interval = float(interval)
+        self.speedup = float(speedup)
+        self.maxlen = max(1, int(history_hours * 3600 / self.interval))
+        self.spike_prob = spike_prob
+        self.rng = random.Random(seed)
+        # sensor nyata dulu (sesuai SENSORS), sisanya ID tambahan bergantian per site
+        from app import SENSORS
+        known = [(m["site"], m["sid"]) for m in SENSORS]
+        extra = [(SITES[i % 2], f"{i + 1:03d}") for i in range(len(known), n_sensors)]
+        self.sensors = (known + extra)[:n_sensors]
+        self.t0_real = time.time()
+        self.lock = threading.Lock()
+        self.tick = -1
+        self.hist = {s: deque(maxlen=self.maxlen) for s in self.sensors}
+        self.level = {s: [0.0, 0.0, 0.0] for s in self.sensors}
+        self._cache = (None, None)
+        # isi riwayat awal
+        self._advance_to(0, backfill=True)
+
+    def _sample(self, key):
+        lv = self.level[key]
+        out = []
+        for i in range(3):
+            lv[i] = 0.995 * lv[i] + self.rng.gauss(0.0, 0.05)
+            v = lv[i] + self.rng.gauss(0.0, 0.02)
+            if self.rng.random() < self.spike_prob:
+                v += self.rng.choice((-1, 1)) * self.rng.uniform(2.0, 4.0)
+            out.append(round(v, 4))
+        return out
+
+    def _advance_to(self, tick, backfill=False):
+        start = tick - self.maxlen + 1 if backfill else self.tick + 1
+        for k in range(start, tick + 1):
+            ts = dt.datetime.fromtimestamp(self.t0_real + k * self.interval, UTC)
+            stamp = ts.strftime("%Y-%m-%d %H:%M:%S")
+            for key in self.sensors:
+                x, y, z = self._sample(key)
+                self.hist[key].append({"ID": key[1], "direkam": stamp, "delta_x": x,
+                                       "delta_y": y, "delta_z": z, "status": "CEK"})
+        self.tick = tick
+
+    def current_tick(self) -> int:
+        return int((time.time() - self.t0_real) * self.speedup / self.interval)
+
+    def payload(self, tick: int | None = None) -> str:
+        with self.lock:
+            tick = self.current_tick() if tick is None else tick
+            if tick > self.tick:
+                self._advance_to(tick)
+            if self._cache[0] == self.tick:
+                return self._cache[1]
+            tables = defaultdict(lambda: {"items": []})
+            for (site, _sid), items in self.hist.items():
+                tables[site]["items"].extend(items)
+            msg = json.dumps({"timestamp": dt.datetime.now(UTC).isoformat(), "tables": tables})
+            self._cache = (self.tick, msg)
+            return msg
+
+# =============== LOCAL WS SERVER ===============
+WIRE_FORMATS = ("json", "msgpack", "msgpack-b64")
+
+def serve(host="127.0.0.1", port=8765, replay_path=None, speedup=1.0, loop=False,
+          n_sensors=12, interval=60.0, history_hours=72.0, fmt="json", deflate=True):
+    """Server WS pengganti upstream: putar ulang rekaman atau kirim payload sintetis.
+
+    `fmt` mengubah setiap pesan ke format kabel lain (protocol.py); `deflate`
+    mengaktifkan permessage-deflate bila klien menawarkannya.
+    """
+    import protocol
+    recording = load_recording(replay_path) if replay_path else None
+    feed = None if recording else SyntheticFeed(n_sensors=n_sensors, interval=interval,
+                                                speedup=speedup, history_hours=history_hours)
+
+    @lru_cache(maxsize=4)
+    def wire(data):
+        if fmt == "json":
+            return data
+        payload = protocol.decode_message(data)
+        if fmt == "msgpack":
+            return protocol.encode_message(payload)
+        return protocol.encode_text(payload)
+
+    def handler(ws):
+        try:
+            if recording:
+                while True:
+                    prev_t = recording[0][0]
+                    for t, data in recording:
+                        time.sleep(max(0.0, (t - prev_t) / speedup))
+                        prev_t = t
+                        ws.send(wire(data))
+                    if not loop:
+                        break
+            else:
+                tick = feed.current_tick()
+                while True:
+                    ws.send(wire(feed.payload(tick)))
+                    tick += 1
+                    wait = feed.t0_real + tick * feed.interval / feed.speedup - time.time()
+                    time.sleep(max(0.0, wait))
+        except Exception:
+            pass  # klien putus
+
+    mode = f"replay {replay_path} ({len(recording)} pesan)" if recording else f"sintetis {n_sensors} sensor"
+    print(f"[serve] ws://{host}:{port}/ws • {mode} • speedup x{speedup} • {fmt}"
+          f"{' + deflate' if deflate else ''}")
+    with ws_serve(handler, host, port, max_size=None,
+                  compression="deflate" if deflate else None) as server:
+        server.serve_forever()
+
+# =============== DASH SESSION DRIVER ===============
+def _cb(output: str, outputs, inputs: list, state: list | None = None) -> dict:
+    return {"output": output, "outputs": outputs, "inputs": inputs,
+            "changedPropIds": [f"{i['id']}.{i['property']}" for i in inputs[:1]],
+            "state": state or []}
+
+def _prop(id_, prop, value=None):
+    return {"id": id_, "property": prop, "value": value}
+
+class HttpTransport:
+    def __init__(self, base_url):
+        import requests
+        self.url = base_url.rstrip("/") + "/_dash-update-component"
+        self.session = requests.Session()
+
+    def post(self, body):
+        r = self.session.post(self.url, json=body, timeout=60)
+        if r.status_code == 204:
+            return {}
+        r.raise_for_status()
+        return r.json()
+
+class InProcessTransport:
+    """Panggil Flask test client langsung (tanpa jaringan) — untuk mengukur biaya callback murni."""
+
+    def __init__(self):
+        import index  # noqa: F401 — set layout & daftarkan callback
+        from app import server
+        self.client = server.test_client()
+
+    def post(self, body):
+        r = self.client.post("/_dash-update-component", json=body)
+        if r.status_code == 204:
+            return {}
+        if r.status_code >= 400:
+            raise RuntimeError(f"HTTP {r.status_code}")
+        return r.get_json()
+
+def _response_value(resp: dict, id_: str, prop: str):
+    return ((resp or {}).get("response") or {}).get(id_, {}).get(prop)
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lat = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.messages = 0
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.lat[name].append(seconds)
+
+    def error(self, name):
+        with self.lock:
+            self.errors[name] += 1
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return float("nan")
+    idx = min(len(sorted_vals) - 1, max(0, math.ceil(q / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[idx]
+
+def _session(idx, transport, ws_url, duration, stats, sensors):
+    rng = random.Random(idx)
+    deadline = time.monotonic() + duration
+    n_tick = 0
+
+    def timed(name, body):
+        t = time.perf_counter()
+        try:
+            resp = transport.post(body)
+        except Exception:
+            stats.error(name)
+            return None
+        stats.add(name, time.perf_counter() - t)
+        return resp
+
+    try:
+        with ws_connect(ws_url, max_size=None) as ws:
+            while time.monotonic() < deadline:
+                try:
+                    msg = ws.recv(timeout=max(0.01, deadline - time.monotonic()))
+                except TimeoutError:
+                    break
+                with stats.lock:
+                    stats.messages += 1
+                message = {"data": msg if isinstance(msg, str) else base64.b64encode(msg).decode("ascii")}
+                resp = timed("on_ws_message", _cb(
+                    "ws-parsed.data", _prop("ws-parsed", "data"),
+                    [_prop("ws", "message", message)]))
+                parsed = _response_value(resp, "ws-parsed", "data")
+                if parsed is None:
+                    continue
+                n_tick += 1
+                timed("refresh_markers", _cb(
+                    "marker-layer.children", _prop("marker-layer", "children"),
+                    [_prop("ws-parsed", "data", parsed), _prop("status-interval", "n_intervals", n_tick)]))
+
+                meta = rng.choice(sensors)
+                selected = {"site": meta["site"], "sid": meta["sid"], "name": meta["name"]}
+                timed("update_drawer", _cb(
+                    "..drawer.children...drawer.style..",
+                    [_prop("drawer", "children"), _prop("drawer", "style")],
+                    [_prop("drawer-open", "data", True), _prop("selected-sensor", "data", selected)],
+                    [_prop("drawer", "style", {}), _prop("xrange-store", "data", None),
+                     _prop("ws-parsed", "data", parsed)]))
+                tab = rng.choice(("tab-graph", "tab-table", "tab-log", "tab-kin", "tab-site"))
+                timed("render_tab", _cb(
+                    "tab-content.children", _prop("tab-content", "children"),
+                    [_prop("sensor-tabs", "value", tab), _prop("ws-parsed", "data", parsed),
+                     _prop("status-interval", "n_intervals", n_tick)],
+                    [_prop("selected-sensor", "data", selected), _prop("xrange-store", "data", None)]))
+                timed("render_fleet", _cb(
+                    "..fleet-panel.children...fleet-panel.style..",
+                    [_prop("fleet-panel", "children"), _prop("fleet-panel", "style")],
+                    [_prop("fleet-open", "data", True), _prop("ws-parsed", "data", parsed),
+                     _prop("status-interval", "n_intervals", n_tick)],
+                    [_prop("fleet-panel", "style", {})]))
+    except Exception as e:
+        print(f"[drive] sesi {idx} berhenti: {e!r}")
+
+def drive(ws_url, dash_url=None, sessions=10, duration=60.0, inprocess=False):
+    from app import SENSORS
+    stats = Stats()
+    transports = [InProcessTransport() if inprocess else HttpTransport(dash_url) for _ in range(sessions)]
+    threads = [threading.Thread(target=_session, daemon=True,
+                                args=(i, transports[i], ws_url, duration, stats, SENSORS))
+               for i in range(sessions)]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    report(stats, elapsed, sessions)
+    return stats
+
+def report(stats: Stats, elapsed: float, sessions: int):
+    total = sum(len(v) for v in stats.lat.values())
+    print(f"\n{sessions} sesi • {elapsed:.1f} s • {stats.messages} pesan WS "
+          f"• {total} callback ({total / elapsed if elapsed else 0:.1f}/s)")
+    print(f"{'callback':<18}{'n':>7}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in ("on_ws_message", "refresh_markers", "update_drawer", "render_tab", "render_fleet"):
+        vals = sorted(stats.lat.get(name, []))
+        print(f"{name:<18}{len(vals):>7}{stats.errors.get(name, 0):>6}"
+              f"{len(vals) / elapsed if elapsed else 0:>9.1f}"
+              f"{_percentile(vals, 50) * 1e3:>10.1f}{_percentile(vals, 99) * 1e3:>10.1f}"
+              f"{(vals[-1] if vals else float('nan')) * 1e3:>10.1f}")
+
+# =============== FORMAT PARITY ===============
+def check_formats(payload_json: str) -> bool:
+    """Regresi protocol.py: payload yang sama lewat JSON, msgpack & base64 harus
+    menghasilkan ws-parsed identik. Tiap format memakai tracker baru; "uptime"
+    tidak dibandingkan karena bergantung jam dinding (diturunkan dari "time").
+    """
+    import callbacks
+    import protocol
+    from anomaly import AnomalyTracker
+    from kinematics import KinematicsTracker
+    from uptime import UptimeTracker
+
+    payload = json.loads(payload_json)
+    variants = {
+        "json": payload_json,
+        "json-bytes": payload_json.encode("utf-8"),
+        "msgpack": protocol.encode_message(payload),
+        "msgpack-raw": protocol.encode_message(payload, compress=False),
+        "msgpack-b64": protocol.encode_text(payload),
+    }
+    saved = callbacks.KINEMATICS, callbacks.ANOMALY, callbacks.UPTIME
+    outs = {}
+    try:
+        for name, raw in variants.items():
+            callbacks.KINEMATICS, callbacks.ANOMALY, callbacks.UPTIME = (
+                KinematicsTracker(), AnomalyTracker(), UptimeTracker())
+            out = callbacks.on_ws_message({"data": raw})
+            for dyn in out["sensors"].values():
+                dyn.pop("uptime", None)
+            outs[name] = json.dumps(out, sort_keys=True)
+    finally:
+        callbacks.KINEMATICS, callbacks.ANOMALY, callbacks.UPTIME = saved
+    ok = True
+    for name, raw in variants.items():
+        same = outs[name] == outs["json"]
+        ok = ok and same
+        print(f"[check] {name:<12} {len(raw):>10} bytes  {'OK' if same else 'BEDA dari json'}")
+    return ok
+
+# =============== CLI ===============
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Uji beban dashboard monitoring longsor")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("record", help="rekam pesan upstream ke file JSONL")
+    p.add_argument("--url", default=UPSTREAM_WS)
+    p.add_argument("--out", required=True)
+    p.add_argument("--count", type=int)
+    p.add_argument("--duration", type=float, help="detik")
+
+    p = sub.add_parser("serve", help="server WS lokal (replay / sintetis)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--replay", help="file JSONL hasil record; tanpa ini payload disintesis")
+    p.add_argument("--loop", action="store_true", help="ulangi rekaman terus-menerus")
+    p.add_argument("--speedup", type=float, default=1.0)
+    p.add_argument("--sensors", type=int, default=12)
+    p.add_argument("--interval", type=float, default=60.0, help="detik simulasi antar sampel")
+    p.add_argument("--history-hours", type=float, default=72.0)
+    p.add_argument("--format", choices=WIRE_FORMATS, default="json", help="format pesan di kabel")
+    p.add_argument("--no-deflate", action="store_true", help="matikan permessage-deflate")
+
+    p = sub.add_parser("drive", help="simulasikan N sesi dashboard")
+    p.add_argument("--ws", default="ws://127.0.0.1:8765/ws")
+    p.add_argument("--dash", default="http://127.0.0.1:8050")
+    p.add_argument("--inprocess", action="store_true", help="pakai Flask test client, bukan HTTP")
+    p.add_argument("--sessions", type=int, default=10)
+    p.add_argument("--duration", type=float, default=60.0)
+
+    p = sub.add_parser("check", help="uji paritas format pesan (json/msgpack/base64 -> ws-parsed identik)")
+    p.add_argument("--replay", help="ambil pesan pertama dari rekaman; tanpa ini payload disintesis")
+    p.add_argument("--sensors", type=int, default=12)
+
+    a = ap.parse_args(argv)
+    if a.cmd == "record":
+        record(a.url, a.out, count=a.count, duration=a.duration)
+    elif a.cmd == "serve":
+        serve(a.host, a.port, replay_path=a.replay, speedup=a.speedup, loop=a.loop,
+              n_sensors=a.sensors, interval=a.interval, history_hours=a.history_hours,
+              fmt=a.format, deflate=not a.no_deflate)
+    elif a.cmd == "drive":
+        drive(a.ws, dash_url=a.dash, sessions=a.sessions, duration=a.duration, inprocess=a.inprocess)
+    elif a.cmd == "check":
+        if a.replay:
+            import protocol
+            payload_json = json.dumps(protocol.decode_message(load_recording(a.replay)[0][1]))
+        else:
+            payload_json = SyntheticFeed(n_sensors=a.sensors, spike_prob=0.01).payload()
+        if not check_formats(payload_json):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling opt-in untuk dispatch callback Dash (/_dash-update-component).
+
+Aktif untuk semua request callback dengan LONGSOR_PROFILE=sample|cprofile,
+atau per request lewat header `X-Longsor-Profile: sample|cprofile`
+(hanya bila LONGSOR_PROFILE_HEADER=1 dan LONGSOR_ADMIN_TOKEN diset; header
+hanya dihormati bila request juga membawa X-Longsor-Admin-Token yang sama).
+
+  sample   : sampler thread membaca stack thread request tiap
+             LONGSOR_PROFILE_INTERVAL_MS ms -> file .folded (format
+             "a;b;c <jumlah>", langsung untuk flamegraph.pl / speedscope)
+  cprofile : cProfile deterministik -> file .prof (pstats/snakeviz)
+
+Profil disimpan di LONGSOR_PROFILE_DIR, maksimal LONGSOR_PROFILE_KEEP file.
+Route admin (token LONGSOR_ADMIN_TOKEN via header X-Longsor-Admin-Token atau ?token=;
+tanpa token terkonfigurasi route ini selalu 404):
+  /_admin/profiles                 daftar profil (JSON)
+  /_admin/profiles/summary         gabungan stack .folded (?callback=nama)
+  /_admin/profiles/<file>          unduh satu profil
+"""
+
+import cProfile
+import datetime as dt
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, abort, g, jsonify, request, send_file
+
+from app import (
+    app, server,
+    PROFILE_MODE, PROFILE_HEADER_OK, PROFILE_DIR, PROFILE_KEEP, PROFILE_INTERVAL_MS, ADMIN_TOKEN
+)
+
+MODES = ("sample", "cprofile")
+# mode per-header hanya bila ada token admin untuk membatasinya
+HEADER_MODE = PROFILE_HEADER_OK and bool(ADMIN_TOKEN)
+PREFIX = app.config.routes_pathname_prefix
+DISPATCH_PATH = f"{PREFIX}_dash-update-component"
+FNAME_RE = re.compile(r"^(?P<stamp>\d{8}T\d{6}_\d{6})_(?P<callback>[\w.-]+)_(?P<mode>sample|cprofile)"
+                      r"_(?P<ms>\d+)ms\.(?P<ext>folded|prof)$")
+
+# =============== SAMPLER ===============
+class StackSampler:
+    """Satu thread sampler untuk semua request yang sedang diprofil.
+
+    Thread hanya bangun selama ada target aktif; biaya per sampel sebanding
+    kedalaman stack thread target, bukan jumlah thread di proses.
+    """
+
+    def __init__(self, interval_s: float):
+        self.interval = interval_s
+        self._lock = threading.Lock()
+        self._targets: dict[int, Counter] = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, tid: int):
+        with self._lock:
+            self._targets[tid] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, tid: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(tid, Counter())
+
+    @staticmethod
+    def _fold(frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                tids = list(self._targets)
+                if not tids:
+                    self._wake.clear()
+            if not tids:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = self._fold(frame)
+                with self._lock:
+                    counter = self._targets.get(tid)
+                    if counter is not None:
+                        counter[stack] += 1
+            del frames
+            time.sleep(self.interval)
+
+SAMPLER = StackSampler(PROFILE_INTERVAL_MS / 1000.0)
+
+# =============== STORAGE ===============
+def callback_name() -> str:
+    body = request.get_json(silent=True) or {}
+    output = body.get("output", "")
+    cb = (app.callback_map.get(output) or {}).get("callback")
+    name = getattr(cb, "__name__", None) or output or "unknown"
+    return re.sub(r"[^\w.-]+", "-", name).strip("-")[:80] or "unknown"
+
+def prune():
+    try:
+        files = sorted((e for e in os.scandir(PROFILE_DIR) if FNAME_RE.match(e.name)),
+                       key=lambda e: e.stat().st_mtime)
+    except FileNotFoundError:
+        return
+    for e in files[:max(0, len(files) - PROFILE_KEEP)]:
+        try:
+            os.remove(e.path)
+        except FileNotFoundError:
+            pass
+
+def save_profile(mode: str, name: str, elapsed_s: float, data) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%S_%f")
+    ext = "folded" if mode == "sample" else "prof"
+    fname = f"{stamp}_{name}_{mode}_{int(elapsed_s * 1000)}ms.{ext}"
+    path = os.path.join(PROFILE_DIR, fname)
+    if mode == "sample":
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, n in data.most_common():
+                fh.write(f"{stack} {n}\n")
+    else:
+        data.dump_stats(path)
+    prune()
+    return fname
+
+# =============== HOOKS ===============
+def requested_mode() -> str | None:
+    if request.path != DISPATCH_PATH:
+        return None
+    if HEADER_MODE and hmac.compare_digest(request.headers.get("X-Longsor-Admin-Token", ""), ADMIN_TOKEN):
+        hdr = (request.headers.get("X-Longsor-Profile") or "").lower()
+        if hdr in MODES:
+            return hdr
+        if hdr in ("1", "true", "on"):
+            return PROFILE_MODE if PROFILE_MODE in MODES else "sample"
+    return PROFILE_MODE if PROFILE_MODE in MODES else None
+
+def start_profile():
+    mode = requested_mode()
+    if mode is None:
+        return
+    if mode == "cprofile":
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            g.profiler = prof
+        except ValueError:
+            # Python >= 3.12: hanya satu profiler deterministik aktif per proses
+            mode = "sample"
+    if mode == "sample":
+        SAMPLER.start(threading.get_ident())
+    g.profile_mode = mode
+    g.profile_t0 = time.perf_counter()
+
+def finish_profile(_exc=None):
+    mode = g.pop("profile_mode", None)
+    if mode is None:
+        return
+    elapsed = time.perf_counter() - g.pop("profile_t0")
+    if mode == "sample":
+        data = SAMPLER.stop(threading.get_ident())
+    else:
+        data = g.pop("profiler")
+        data.disable()
+    try:
+        save_profile(mode, callback_name(), elapsed, data)
+    except Exception as e:
+        server.logger.warning("profil gagal disimpan: %r", e)
+
+if PROFILE_HEADER_OK and not ADMIN_TOKEN:
+    server.logger.warning("LONGSOR_PROFILE_HEADER=1 diabaikan: LONGSOR_ADMIN_TOKEN belum diset")
+
+if PROFILE_MODE in MODES or HEADER_MODE:
+    server.before_request(start_profile)
+    server.teardown_request(finish_profile)
+
+# =============== ADMIN ROUTES ===============
+def require_admin():
+    if not ADMIN_TOKEN:
+        abort(404)
+    token = request.headers.get("X-Longsor-Admin-Token") or request.args.get("token") or ""
+    if not hmac.compare_digest(token, ADMIN_TOKEN):
+        abort(403)
+
+def list_profiles() -> list[dict]:
+    out = []
+    try:
+        entries = list(os.scandir(PROFILE_DIR))
+    except FileNotFoundError:
+        return out
+    for e in entries:
+        m = FNAME_RE.match(e.name)
+        if m:
+            out.append({"file": e.name, "callback": m["callback"], "mode": m["mode"],
+                        "duration_ms": int(m["ms"]), "bytes": e.stat().st_size,
+                        "created": dt.datetime.strptime(m["stamp"], "%Y%m%dT%H%M%S_%f")
+                                     .replace(tzinfo=dt.timezone.utc).isoformat()})
+    return sorted(out, key=lambda p: p["file"], reverse=True)
+
+def admin_index():
+    require_admin()
+    return jsonify(list_profiles())
+
+def admin_summary():
+    """Gabungan semua stack .folded (opsional difilter ?callback=), siap untuk flamegraph."""
+    require_admin()
+    only = request.args.get("callback")
+    total = Counter()
+    for p in list_profiles():
+        if p["mode"] != "sample" or (only and p["callback"] != only):
+            continue
+        with open(os.path.join(PROFILE_DIR, p["file"]), encoding="utf-8") as fh:
+            for line in fh:
+                stack, _, n = line.rstrip("\n").rpartition(" ")
+                if stack and n.isdigit():
+                    total[stack] += int(n)
+    body = "".join(f"{stack} {n}\n" for stack, n in total.most_common())
+    return Response(body, mimetype="text/plain")
+
+def admin_file(fname: str):
+    require_admin()
+    if not FNAME_RE.match(fname) or not os.path.isfile(os.path.join(PROFILE_DIR, fname)):
+        abort(404)
+    mimetype = "text/plain" if fname.endswith(".folded") else "application/octet-stream"
+    return send_file(os.path.join(PROFILE_DIR, fname), mimetype=mimetype, as_attachment=fname.endswith(".prof"))
+
+server.add_url_rule(f"{PREFIX}_admin/profiles", "admin_profiles", admin_index)
+server.add_url_rule(f"{PREFIX}_admin/profiles/summary", "admin_profiles_summary", admin_summary)
+server.add_url_rule(f"{PREFIX}_admin/profiles/<fname>", "admin_profiles_file", admin_file)
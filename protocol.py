@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Format pesan feed WS yang diterima on_ws_message, dideteksi otomatis per pesan:
+
+  1. JSON teks (format lama): {"timestamp", "tables": {tb: {"items": [{...}, ...]}}}
+  2. Biner kolumnar: b"LSC1" + 1 byte flag (bit0 = zlib) + MessagePack
+     {"timestamp", "tables": {tb: {"columns": {"ID": [...], "direkam": [...], ...}}}}
+     Nama kolom hanya dikirim sekali per tabel (bukan per baris).
+  3. Biner (2) yang dibungkus base64 dalam frame teks — komponen WebSocket
+     dash_extensions hanya meneruskan `e.data` teks ke Dash, jadi jalur
+     browser memakai bentuk ini; konsumen di sisi server menerima bytes mentah.
+
+permessage-deflate dinegosiasikan di level WebSocket (browser & pustaka
+websockets mendukungnya otomatis) dan bisa dikombinasikan dengan format mana pun.
+"""
+
+import base64
+import binascii
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # opsional: tanpa msgpack hanya JSON yang didukung
+    msgpack = None
+
+MAGIC = b"LSC1"
+FLAG_ZLIB = 0x01
+
+def rows_to_columns(items: list[dict]) -> dict[str, list]:
+    """items (list of dict) -> kolom; kunci yang tidak ada di suatu baris diisi None."""
+    keys = []
+    seen = set()
+    for it in items:
+        for k in it:
+            if k not in seen:
+                seen.add(k)
+                keys.append(k)
+    return {k: [it.get(k) for it in items] for k in keys}
+
+def table_columns(content: dict | None) -> dict[str, list]:
+    content = content or {}
+    if "columns" in content:
+        return content["columns"] or {}
+    return rows_to_columns(content.get("items") or [])
+
+# =============== ENCODER (fixture/uji & server replay) ===============
+def encode_message(payload: dict, compress: bool = True) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("format biner membutuhkan paket msgpack")
+    tables = {tb: {"columns": table_columns(content)} for tb, content in (payload.get("tables") or {}).items()}
+    body = msgpack.packb({"timestamp": payload.get("timestamp"), "tables": tables}, use_bin_type=True)
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_ZLIB
+    return MAGIC + bytes([flags]) + body
+
+def encode_text(payload: dict, compress: bool = True) -> str:
+    """Frame biner dibungkus base64 (untuk dikirim sebagai frame teks)."""
+    return base64.b64encode(encode_message(payload, compress=compress)).decode("ascii")
+
+# =============== DECODER ===============
+def _decode_binary(data: bytes) -> dict:
+    if msgpack is None:
+        raise ValueError("pesan biner diterima tetapi paket msgpack tidak terpasang")
+    flags, body = data[len(MAGIC)], data[len(MAGIC) + 1:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return msgpack.unpackb(body, raw=False)
+
+def _looks_b64_binary(text: str) -> bool:
+    try:
+        return base64.b64decode(text[:8], validate=True)[:len(MAGIC)] == MAGIC
+    except (binascii.Error, ValueError):
+        return False
+
+def decode_message(raw) -> dict:
+    """Terima dict, str (JSON / base64 biner) atau bytes; kembalikan payload dict.
+
+    ValueError bila format tidak dikenali.
+    """
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        data = bytes(raw)
+        if data[:len(MAGIC)] == MAGIC:
+            return _decode_binary(data)
+        return json.loads(data.decode("utf-8"))
+    if isinstance(raw, str):
+        text = raw.lstrip()
+        if text[:1] in ("{", "["):
+            return json.loads(text)
+        if _looks_b64_binary(text):
+            return _decode_binary(base64.b64decode(text))
+    raise ValueError("format pesan WS tidak dikenali")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Layanan aset hasil build_assets.py di app.server:
+
+  /static-build/<nama.fingerprint.ext>  -> cache 1 tahun, immutable
+  /assets/<path>                        -> varian .br/.gz bila ada (negosiasi
+                                           Accept-Encoding); cache panjang hanya
+                                           bila URL membawa ?m= (cache-busting Dash)
+
+Entri manifest hanya dipakai selama ukuran & mtime file di assets/ masih sama
+dengan saat build; bila tidak, request dilayani Dash seperti biasa.
+"""
+
+import os
+
+from flask import request, send_file, abort
+
+from app import app, server, STATIC_BUILD_DIR, ASSET_MANIFEST, asset_entry
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+BY_PATH = {e["path"]: e for e in ASSET_MANIFEST.values()}
+
+def accepted_encodings(header: str | None) -> dict[str, float]:
+    out = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[token] = q
+    return out
+
+def choose_encoding(entry: dict, header: str | None) -> str | None:
+    acc = accepted_encodings(header)
+    star = acc.get("*", 0.0)
+    for enc, key in (("br", "br"), ("gzip", "gz")):
+        if entry.get(key) and acc.get(enc, star) > 0:
+            return enc
+    return None
+
+def send_entry(entry: dict, cache_control: str | None):
+    path = os.path.join(STATIC_BUILD_DIR, *entry["path"].split("/"))
+    enc = choose_encoding(entry, request.headers.get("Accept-Encoding"))
+    suffix = {"br": ".br", "gzip": ".gz"}.get(enc, "")
+    if not os.path.isfile(path + suffix):
+        abort(404)
+    resp = send_file(path + suffix, mimetype=entry["type"], conditional=True,
+                     etag=f"{entry['hash']}-{enc or 'identity'}")
+    if enc:
+        resp.headers["Content-Encoding"] = enc
+    resp.headers["Vary"] = "Accept-Encoding"
+    if cache_control:
+        resp.headers["Cache-Control"] = cache_control
+    return resp
+
+def serve_fingerprinted(fname: str):
+    entry = BY_PATH.get(fname)
+    if entry is None:
+        abort(404)
+    return send_entry(entry, IMMUTABLE)
+
+ASSETS_PREFIX = f"{app.config.routes_pathname_prefix}assets/"
+
+def serve_dash_asset():
+    """Hook sebelum route /assets/ milik Dash: layani varian terkompresi bila tersedia."""
+    if request.method != "GET" or not request.path.startswith(ASSETS_PREFIX):
+        return None
+    # entri yang sudah basi (sumber diubah setelah build) diserahkan ke Dash
+    entry = asset_entry(request.path[len(ASSETS_PREFIX):])
+    if entry is None or not (entry.get("gz") or entry.get("br")):
+        return None
+    return send_entry(entry, IMMUTABLE if request.args.get("m") else None)
+
+if ASSET_MANIFEST:
+    server.add_url_rule(f"{app.config.routes_pathname_prefix}static-build/<path:fname>",
+                        "static_build", serve_fingerprinted)
+    server.before_request(serve_dash_asset)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Tile proxy lokal untuk base layer ESRI/OSM dengan cache LRU di disk.
+
+Aktifkan dengan LONGSOR_TILE_PROXY=1: TileLayer diarahkan ke
+/tiles/<layer>/{z}/{x}/{y}, tile diambil dari cache disk (dibatasi
+LONGSOR_TILE_CACHE_MB) dan miss diambil paralel lewat HTTP client ber-pool.
+
+Pre-seed area sekitar SENSORS (hormati kebijakan tile OSM; default hanya ESRI):
+    python tileproxy.py seed --zmin 12 --zmax 17 --margin-km 2
+"""
+
+import argparse
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Response, abort
+
+from app import app, server, SENSORS, TILE_SOURCES, TILE_PROXY, TILE_CACHE_DIR, TILE_CACHE_MAX_MB
+
+FETCH_WORKERS = 8
+FETCH_TIMEOUT = 15       # detik per request upstream
+WAIT_TIMEOUT = 30        # batas tunggu request Flask atas satu tile
+USER_AGENT = "monitoring-longsor-tileproxy/1.0"
+TILE_MAX_AGE = 7 * 24 * 3600
+
+# =============== CACHE DISK (LRU) ===============
+class TileCache:
+    """Cache tile di disk, dibatasi total byte; urutan LRU mengikuti mtime file.
+
+    Indeks (OrderedDict key -> ukuran) dibangun ulang dari disk saat start,
+    sehingga batas ukuran tetap berlaku lintas restart.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self.total = 0
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _load(self):
+        entries = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            for fn in files:
+                if fn.endswith(".tmp"):
+                    continue
+                p = os.path.join(dirpath, fn)
+                st = os.stat(p)
+                key = os.path.relpath(p, self.root).replace(os.sep, "/")
+                entries.append((st.st_mtime, key, st.st_size))
+        for _mtime, key, size in sorted(entries):
+            self._index[key] = size
+            self.total += size
+        self._evict()
+
+    def _evict(self):
+        while self.total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.total -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as fh:
+                data = fh.read()
+            os.utime(self._path(key))
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self.total -= self._index.pop(key, 0)
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.total -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self.total += len(data)
+            self._evict()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+# =============== FETCHER ===============
+class TileFetcher:
+    """Ambil tile dari upstream; miss yang sama digabung (satu request per tile)."""
+
+    def __init__(self, cache: TileCache, workers: int = FETCH_WORKERS):
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(TILE_SOURCES), pool_maxsize=workers, max_retries=2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @staticmethod
+    def key(layer, z, x, y) -> str:
+        return f"{layer}/{z}/{x}/{y}"
+
+    def _download(self, layer, z, x, y) -> bytes:
+        url = TILE_SOURCES[layer].format(s="abc"[(x + y) % 3], z=z, x=x, y=y)
+        r = self.session.get(url, timeout=FETCH_TIMEOUT)
+        r.raise_for_status()
+        self.cache.put(self.key(layer, z, x, y), r.content)
+        return r.content
+
+    def submit(self, layer, z, x, y):
+        k = self.key(layer, z, x, y)
+        with self._lock:
+            fut = self._inflight.get(k)
+            if fut is not None:
+                return fut
+            fut = self.pool.submit(self._download, layer, z, x, y)
+            self._inflight[k] = fut
+        # di luar lock: bila future sudah selesai, callback langsung jalan di thread ini
+        fut.add_done_callback(lambda f, k=k: self._drop(k, f))
+        return fut
+
+    def _drop(self, k, fut):
+        with self._lock:
+            if self._inflight.get(k) is fut:
+                del self._inflight[k]
+
+    def get(self, layer, z, x, y) -> bytes:
+        data = self.cache.get(self.key(layer, z, x, y))
+        if data is not None:
+            return data
+        return self.submit(layer, z, x, y).result(timeout=WAIT_TIMEOUT)
+
+FETCHER = TileFetcher(TileCache(TILE_CACHE_DIR, TILE_CACHE_MAX_MB * 1024 * 1024))
+
+def sniff_mimetype(data: bytes) -> str:
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    return "application/octet-stream"
+
+# =============== ROUTE ===============
+def serve_tile(layer: str, z: int, x: int, y: int):
+    if layer not in TILE_SOURCES or not (0 <= z <= 22) or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        abort(404)
+    try:
+        data = FETCHER.get(layer, z, x, y)
+    except Exception:
+        abort(502)
+    return Response(data, mimetype=sniff_mimetype(data),
+                    headers={"Cache-Control": f"public, max-age={TILE_MAX_AGE}"})
+
+if TILE_PROXY:
+    server.add_url_rule(f"{app.config.routes_pathname_prefix}tiles/<layer>/<int:z>/<int:x>/<int:y>",
+                        "tile_proxy", serve_tile)
+
+# =============== PRE-SEED ===============
+def deg2tile(lat: float, lon: float, z: int) -> tuple[int, int]:
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_r = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_r)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def sensor_bbox(margin_km: float = 2.0) -> tuple[float, float, float, float]:
+    """(lat_min, lon_min, lat_max, lon_max) semua SENSORS + margin."""
+    lats = [s["lat"] for s in SENSORS]
+    lons = [s["lon"] for s in SENSORS]
+    dlat = margin_km / 111.32
+    dlon = margin_km / (111.32 * max(0.01, math.cos(math.radians(sum(lats) / len(lats)))))
+    return min(lats) - dlat, min(lons) - dlon, max(lats) + dlat, max(lons) + dlon
+
+def tiles_in_bbox(bbox, zmin: int, zmax: int):
+    lat_min, lon_min, lat_max, lon_max = bbox
+    for z in range(zmin, zmax + 1):
+        x0, y0 = deg2tile(lat_max, lon_min, z)
+        x1, y1 = deg2tile(lat_min, lon_max, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+def seed(layers, zmin: int, zmax: int, margin_km: float = 2.0) -> tuple[int, int]:
+    """Isi cache untuk bbox sensor; return (jumlah diambil, jumlah gagal)."""
+    todo = [(layer, z, x, y) for layer in layers for z, x, y in tiles_in_bbox(sensor_bbox(margin_km), zmin, zmax)
+            if FETCHER.key(layer, z, x, y) not in FETCHER.cache]
+    print(f"[seed] {len(todo)} tile belum ada di cache")
+    futs = [FETCHER.submit(*t) for t in todo]
+    ok = failed = 0
+    for i, f in enumerate(futs, 1):
+        try:
+            f.result()
+            ok += 1
+        except Exception:
+            failed += 1
+        if i % 100 == 0 or i == len(futs):
+            print(f"[seed] {i}/{len(futs)} • gagal {failed} • cache {FETCHER.cache.total / 1e6:.1f} MB")
+    return ok, failed
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Tile proxy monitoring longsor")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("seed", help="pre-seed cache di sekitar lokasi sensor")
+    p.add_argument("--layers", nargs="+", default=["esri_imagery"], choices=sorted(TILE_SOURCES))
+    p.add_argument("--zmin", type=int, default=12)
+    p.add_argument("--zmax", type=int, default=17)
+    p.add_argument("--margin-km", type=float, default=2.0)
+    a = ap.parse_args()
+    seed(a.layers, a.zmin, a.zmax, a.margin_km)
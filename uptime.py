@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Analitik uptime armada sensor: deteksi gap data, penurunan laju sampling,
+dan persentase ketersediaan harian per `site:sid`.
+
+Dihitung inkremental saat ingest: hanya timestamp baru (> sampel terakhir)
+yang diproses, secara vektor (numpy diff terhadap kadens), dan hitungan
+per hari disimpan sehingga panel ringkasan armada cukup membaca hasilnya.
+"""
+
+import datetime as dt
+import threading
+from collections import deque
+
+import numpy as np
+
+from app import (
+    UPTIME_CADENCE_S, UPTIME_GAP_FACTOR, UPTIME_RATE_DROP_FACTOR, UPTIME_DAYS
+)
+
+DAY_S = 86400
+
+def _iso(t_s: float) -> str:
+    return dt.datetime.fromtimestamp(t_s, dt.timezone.utc).isoformat()
+
+class SensorUptime:
+    def __init__(self):
+        self.first_t = None
+        self.last_t = None
+        self.day_counts: dict[int, int] = {}      # hari (epoch // 86400) -> jumlah sampel
+        self.diffs = deque(maxlen=1000)           # selisih antar sampel (detik)
+        self.gaps = deque(maxlen=20)              # (mulai, selesai, durasi_s)
+        self.n_gaps = 0
+        self.in_gap = False                       # selisih terakhir masih > ambang gap
+
+    def cadence(self) -> float | None:
+        """Kadens nominal: konfigurasi, atau median selisih jangka panjang."""
+        if UPTIME_CADENCE_S:
+            return UPTIME_CADENCE_S
+        return float(np.median(self.diffs)) if self.diffs else None
+
+    def recent_cadence(self, n: int = 12) -> float | None:
+        if not self.diffs:
+            return None
+        return float(np.median(list(self.diffs)[-n:]))
+
+    def push(self, t: np.ndarray):
+        """t: epoch detik baru (terurut naik, semuanya > last_t)."""
+        if not t.size:
+            return
+        if self.first_t is None:
+            self.first_t = float(t[0])
+        prev = np.concatenate(([self.last_t], t)) if self.last_t is not None else t
+        d = np.diff(prev)
+        self.diffs.extend(d.tolist())
+        cad = self.cadence()
+        if cad and d.size:
+            # satu gap per rangkaian selisih besar yang bersambung: penurunan laju sampling
+            # (semua selisih sesudahnya > ambang) dihitung sekali, bukan per sampel
+            big = d > UPTIME_GAP_FACTOR * cad
+            for i in np.flatnonzero(big):
+                if (i > 0 and big[i - 1]) or (i == 0 and self.in_gap):
+                    start = self.gaps[-1][0]
+                    self.gaps[-1] = (start, float(prev[i + 1]), float(prev[i + 1]) - start)
+                else:
+                    self.gaps.append((float(prev[i]), float(prev[i + 1]), float(d[i])))
+                    self.n_gaps += 1
+            self.in_gap = bool(big[-1])
+        days, counts = np.unique((t // DAY_S).astype(np.int64), return_counts=True)
+        for day, n in zip(days.tolist(), counts.tolist()):
+            self.day_counts[day] = self.day_counts.get(day, 0) + n
+        self.last_t = float(t[-1])
+        cutoff = int(self.last_t // DAY_S) - UPTIME_DAYS
+        for day in [k for k in self.day_counts if k <= cutoff]:
+            del self.day_counts[day]
+
+    def snapshot(self) -> dict:
+        """State untuk store; gap terbuka & persen harian dihitung ulang di fleet_rows."""
+        cad, recent = self.cadence(), self.recent_cadence()
+        return {
+            "first_t": self.first_t,
+            "last_t": self.last_t,
+            "day_counts": {str(day): n for day, n in self.day_counts.items()},
+            "cadence_s": None if cad is None else round(cad, 1),
+            "recent_cadence_s": None if recent is None else round(recent, 1),
+            "rate_drop": bool(cad and recent and recent > UPTIME_RATE_DROP_FACTOR * cad),
+            "gaps": [[_iso(a), _iso(b), round(s)] for a, b, s in list(self.gaps)[-10:]],
+            "n_gaps": self.n_gaps,
+        }
+
+class UptimeTracker:
+    """Registry state per `site:sid`; sampel yang sudah diproses dilewati."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict[str, SensorUptime] = {}
+
+    def update(self, key: str, times: list[float]) -> dict:
+        t = np.asarray(times, dtype=float)
+        with self._lock:
+            st = self._state.get(key)
+            if st is None:
+                st = self._state[key] = SensorUptime()
+            if st.last_t is not None:
+                t = t[np.searchsorted(t, st.last_t, side="right"):]
+            st.push(np.unique(t))
+            return st.snapshot()
+
+UPTIME = UptimeTracker()
+
+def availability(up: dict, now_s: float) -> dict[str, float]:
+    """Persen sampel diterima vs diharapkan per hari UTC, dalam rentang [first_t, now].
+
+    Setiap hari kalender sejak sampel pertama (maks. UPTIME_DAYS) ikut dihitung;
+    hari tanpa sampel sama sekali bernilai 0%.
+    """
+    cad, first_t = up.get("cadence_s"), up.get("first_t")
+    if not cad or first_t is None:
+        return {}
+    counts = up.get("day_counts") or {}
+    last_day = int(now_s // DAY_S)
+    first_day = max(int(first_t // DAY_S), last_day - UPTIME_DAYS + 1)
+    out = {}
+    for day in range(first_day, last_day + 1):
+        n = counts.get(str(day), 0)
+        start = max(day * DAY_S, first_t)
+        end = min((day + 1) * DAY_S, now_s)
+        expected = max(1.0, (end - start) / cad)
+        label = dt.datetime.fromtimestamp(day * DAY_S, dt.timezone.utc).strftime("%Y-%m-%d")
+        out[label] = round(min(100.0, 100.0 * n / expected), 1)
+    return out
+
+def fleet_rows(sensors_meta: list[dict], sensor_map: dict, days: int = 7) -> list[dict]:
+    """Satu baris ringkasan per sensor untuk panel armada.
+
+    Dibaca dari state hasil ingest, tetapi dievaluasi terhadap jam sekarang sehingga
+    gap terbuka bertambah & persentase hari ini turun walau feed berhenti.
+    """
+    now = dt.datetime.now(dt.timezone.utc)
+    now_s = now.timestamp()
+    today = now.strftime("%Y-%m-%d")
+    # jendela tetap `days` hari kalender terakhir (hari sebelum sampel pertama tidak dihitung)
+    window = [(now - dt.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    rows = []
+    for meta in sensors_meta:
+        up = (sensor_map.get(f"{meta['site']}:{meta['sid']}") or {}).get("uptime") or {}
+        avail = availability(up, now_s)
+        cad, last_t = up.get("cadence_s"), up.get("last_t")
+        open_gap = None
+        if cad and last_t is not None and now_s - last_t > UPTIME_GAP_FACTOR * cad:
+            open_gap = round(now_s - last_t)
+        last_days = [avail[d] for d in window if d in avail]
+        rows.append({
+            "name": meta["name"],
+            "today": avail.get(today, 0.0),
+            "avg": round(sum(last_days) / len(last_days), 1) if last_days else 0.0,
+            "n_gaps": up.get("n_gaps", 0),
+            "cadence_s": up.get("cadence_s"),
+            "rate_drop": up.get("rate_drop", False),
+            "open_gap_s": open_gap,
+            "has_data": bool(up),
+        })
+    return rows